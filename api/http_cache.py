@@ -0,0 +1,246 @@
+# api/http_cache.py
+"""On-disk cache of API responses revalidated with ETag/Last-Modified.
+
+Bodies are stored per URL and token scope together with the validators the
+server sent. Later requests for the same URL are made conditional and a
+``304 Not Modified`` reply is answered from the cache, so unchanged stash
+tabs cost neither bandwidth nor JSON parsing. Recently used bodies are also
+kept decoded in memory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.path.expanduser("~/.exiledoverlay_cache/http")
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+MAX_MEMORY_ENTRIES = 256
+INDEX_FILE = "index.json"
+
+
+def cache_key(url: str, scope: str = "") -> str:
+    """Return the cache key for ``url`` requested with a token of ``scope``."""
+    return hashlib.sha256(f"{scope}\n{url}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of response bodies and their validators."""
+
+    def __init__(
+        self,
+        directory: str = CACHE_DIR,
+        max_bytes: int = MAX_CACHE_BYTES,
+        memory_entries: int = MAX_MEMORY_ENTRIES,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, dict] | None = None
+        self._total_bytes = 0  # sum of the sizes in the index
+        # The index is written by flush(), not on every change, so a sweep
+        # storing many tabs rewrites index.json once.
+        self._dirty = False
+        self._decoded: OrderedDict[str, object] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -- index -----------------------------------------------------------
+    def _load_index(self) -> OrderedDict[str, dict]:
+        if self._index is None:
+            try:
+                with open(os.path.join(self.directory, INDEX_FILE), "r", encoding="utf-8") as f:
+                    self._index = OrderedDict(json.load(f))
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._index = OrderedDict()
+            self._total_bytes = sum(entry["size"] for entry in self._index.values())
+        return self._index
+
+    def _save_index(self) -> None:
+        self._dirty = False
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, INDEX_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(self._index.items()), f)
+        os.replace(tmp, path)
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key: str, decoded) -> None:
+        self._decoded[key] = decoded
+        self._decoded.move_to_end(key)
+        while len(self._decoded) > self.memory_entries:
+            self._decoded.popitem(last=False)
+
+    def _drop(self, key: str) -> None:
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry["size"]
+            self._dirty = True
+        self._decoded.pop(key, None)
+        try:
+            os.remove(self._body_path(key))
+        except FileNotFoundError:
+            pass
+
+    # -- public API ------------------------------------------------------
+    def conditional_headers(self, key: str) -> dict:
+        """Return the validator headers to send for ``key``, if cached."""
+        with self._lock:
+            entry = self._load_index().get(key)
+            if entry is None:
+                return {}
+            headers = {}
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def load(self, key: str, remember: bool = True):
+        """Return the cached body for ``key`` after a 304, or ``None``.
+
+        With ``remember`` unset the decoded body is not kept in memory.
+        """
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                return None
+            index.move_to_end(key)
+            if key in self._decoded:
+                self._decoded.move_to_end(key)
+                self.hits += 1
+                return self._decoded[key]
+            try:
+                with open(self._body_path(key), "rb") as f:
+                    decoded = json.loads(f.read())
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._drop(key)
+                return None
+            if remember:
+                self._remember(key, decoded)
+            self.hits += 1
+            return decoded
+
+    def _add_entry(self, key: str, headers, size: int) -> None:
+        """Record a body already written to ``_body_path(key)``."""
+        index = self._load_index()
+        old = index.get(key)
+        if old is not None:
+            self._total_bytes -= old["size"]
+        index[key] = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "size": size,
+        }
+        index.move_to_end(key)
+        self._total_bytes += size
+        self._dirty = True
+        while self._total_bytes > self.max_bytes:
+            self._drop(next(iter(index)))
+            self.evictions += 1
+
+    @staticmethod
+    def cacheable(headers) -> bool:
+        """Return whether a response with ``headers`` can be revalidated."""
+        return bool(headers.get("ETag") or headers.get("Last-Modified"))
+
+    def store(self, key: str, headers, body: bytes, decoded, remember: bool = True) -> None:
+        """Cache a 200 response if the server sent validators for it.
+
+        ``decoded`` is kept in memory as well unless ``remember`` is unset.
+        """
+        with self._lock:
+            self.misses += 1
+            if not self.cacheable(headers) or len(body) > self.max_bytes:
+                if key in self._load_index():
+                    self._drop(key)
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._body_path(key)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+            self._decoded.pop(key, None)
+            self._add_entry(key, headers, len(body))
+            if remember:
+                self._remember(key, decoded)
+
+    def open_body(self, key: str):
+        """Open the cached body for ``key`` after a 304, or return ``None``.
+
+        Used by streaming readers that parse the body incrementally instead
+        of keeping a decoded copy.
+        """
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                return None
+            try:
+                fp = open(self._body_path(key), "rb")
+            except FileNotFoundError:
+                self._drop(key)
+                return None
+            index.move_to_end(key)
+            self.hits += 1
+            return fp
+
+    def spool(self, key: str):
+        """Return a temporary file a streamed body can be copied into."""
+        os.makedirs(self.directory, exist_ok=True)
+        return open(f"{self._body_path(key)}.part", "wb")
+
+    def commit(self, key: str, headers, spool) -> None:
+        """Move a completely written ``spool`` file into the cache.
+
+        ``spool`` may be ``None`` for a response that was not cacheable, in
+        which case any older entry for ``key`` is dropped.
+        """
+        if spool is not None:
+            spool.close()
+        with self._lock:
+            self.misses += 1
+            size = os.path.getsize(spool.name) if spool is not None else 0
+            if spool is None or not self.cacheable(headers) or size > self.max_bytes:
+                if spool is not None:
+                    os.remove(spool.name)
+                if key in self._load_index():
+                    self._drop(key)
+                return
+            os.replace(spool.name, self._body_path(key))
+            self._decoded.pop(key, None)
+            self._add_entry(key, headers, size)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if key in self._load_index():
+                self._drop(key)
+
+    def flush(self) -> None:
+        """Write the index to disk if it changed since the last flush.
+
+        Bodies are on disk as soon as they are stored; an index that was
+        not flushed before a crash only loses those entries.
+        """
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(index),
+                "bytes": self._total_bytes,
+            }
@@ -0,0 +1,170 @@
+# api/http_client.py
+"""Small HTTP client that keeps connections alive between requests.
+
+``urllib.request.urlopen`` opens a new TCP (and TLS) connection for every
+call. A stash sweep sends hundreds of requests to the same host, so the
+client below keeps idle connections per host and reuses them. Responses are
+requested gzip compressed and decoded transparently.
+"""
+
+from __future__ import annotations
+
+import gzip
+import http.client
+import json
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT = 30  # seconds
+MAX_IDLE_PER_HOST = 8
+
+# Errors raised when the server closed a kept-alive connection while it sat
+# idle in the pool. The request is retried once on a fresh connection.
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class Response:
+    """A fully read HTTP response."""
+
+    def __init__(self, status: int, headers: http.client.HTTPMessage, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class StreamResponse:
+    """A response whose decompressed body is read from ``fp``."""
+
+    def __init__(self, status: int, headers: http.client.HTTPMessage, fp):
+        self.status = status
+        self.headers = headers
+        self.fp = fp
+
+
+class HTTPClient:
+    """Thread-safe client with a pool of persistent connections per host."""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, max_idle: int = MAX_IDLE_PER_HOST):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: dict[tuple[str, str, int | None], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _checkout(self, key) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+            self.connections_opened += 1
+        scheme, host, port = key
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        return conn, False
+
+    def _checkin(self, key, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, method, url, headers, body):
+        """Send a request on a pooled connection and return it with the response."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip")
+        headers.setdefault("Connection", "keep-alive")
+
+        while True:
+            conn, reused = self._checkout(key)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return key, conn, conn.getresponse()
+            except _STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+
+    def _finish(self, key, conn, resp) -> None:
+        if resp.will_close or not resp.isclosed():
+            conn.close()
+        else:
+            self._checkin(key, conn)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict | None = None,
+        body: bytes | None = None,
+    ) -> Response:
+        """Send a request and return the decoded :class:`Response`."""
+        key, conn, resp = self._send(method, url, headers, body)
+        try:
+            data = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        self._finish(key, conn, resp)
+
+        if resp.headers.get("Content-Encoding", "").lower() == "gzip":
+            data = gzip.decompress(data)
+        return Response(resp.status, resp.headers, data)
+
+    @contextmanager
+    def stream(self, url: str, headers: dict | None = None) -> Iterator[StreamResponse]:
+        """GET ``url`` and yield a response whose body is read incrementally.
+
+        The connection returns to the pool only if the body was read to the
+        end inside the ``with`` block.
+        """
+        key, conn, resp = self._send("GET", url, headers, None)
+        body = resp
+        if resp.headers.get("Content-Encoding", "").lower() == "gzip":
+            body = gzip.GzipFile(fileobj=resp, mode="rb")
+        try:
+            yield StreamResponse(resp.status, resp.headers, body)
+        except BaseException:
+            conn.close()
+            raise
+        self._finish(key, conn, resp)
+
+    def get(self, url: str, headers: dict | None = None) -> Response:
+        return self.request("GET", url, headers)
+
+    def post(self, url: str, body: bytes, headers: dict | None = None) -> Response:
+        return self.request("POST", url, headers, body)
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for idle in pools:
+            for conn in idle:
+                conn.close()
+
+
+# Shared by the API and OAuth helpers so they reuse the same connections.
+default_client = HTTPClient()
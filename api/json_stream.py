@@ -0,0 +1,108 @@
+# api/json_stream.py
+"""Incremental parsing of a large array inside a JSON document.
+
+Stash tab responses are one object with a potentially huge ``items`` array.
+:func:`iter_array` yields the elements of that array one at a time while
+reading the body in chunks, so only the item being processed is alive
+instead of the whole decoded document.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+from typing import BinaryIO, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Text buffer over a binary stream that grows on demand."""
+
+    def __init__(self, fp: BinaryIO, chunk_size: int):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decode = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read another chunk, returning ``False`` at end of input."""
+        if self.eof:
+            return False
+        chunk = self._fp.read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self._decode.decode(b"", final=True)
+        else:
+            self.buf = self.buf[self.pos:] + self._decode.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next
+            # chunk, so only trust it once more input has been seen.
+            if end == len(self.buf) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array(fp: BinaryIO, key: str = "items", chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """Yield the elements of the array stored under ``key`` in ``fp``.
+
+    ``fp`` must contain a JSON object. Other members of the object are
+    decoded and discarded; a missing ``key`` yields nothing.
+    """
+    reader = _Reader(fp, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.peek() == "]":
+                        reader.pos += 1
+                        break
+                    reader.expect(",")
+        else:
+            reader.value()
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
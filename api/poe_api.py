@@ -1,23 +1,66 @@
 # api/poe_api.py
+import hashlib
 import json
-from urllib import request, parse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib import parse
 
-def fetch_gear(account_name, character_name, poesessid=None):
-    url = "https://api.pathofexile.com/character-window/get-items"
+from api.http_cache import ResponseCache, cache_key
+from api.http_client import default_client
+from api.json_stream import iter_array
+from api.rate_limit import RateLimitGovernor, endpoint_key
+from api.single_flight import SingleFlight
+from api.stash_index import StashIndex, TabIndex
+
+API_BASE = "https://api.pathofexile.com"
+# Slightly shorter than the Currency view's 30 s timer so every tick gets
+# fresh data, while other views asking in between reuse the same sweep.
+SNAPSHOT_TTL = 25  # seconds
+# Number of stash tabs downloaded concurrently during a sweep. Use 1 to fetch
+# tabs one after another.
+STASH_WORKERS = 4
+# Parse stash tabs item by item and keep only aggregated totals instead of
+# holding every decoded item in memory.
+STREAM_TABS = True
+# How often a request answered with 429 is retried after the governor has
+# waited out the advertised restriction.
+RATE_LIMIT_RETRIES = 2
+
+# Shared by every request in this module so all views draw from the same
+# rate limit budget.
+rate_limiter = RateLimitGovernor()
+# Bodies of unchanged responses are served from here after a 304.
+response_cache = ResponseCache()
+# Concurrent callers for the same URL and token share one request;
+# single_flight.metrics()["coalesced"] counts the requests saved.
+single_flight = SingleFlight()
+STASH_SCOPE = "account:stashes"
+
+
+class NotModified(Exception):
+    """The server answered 304 and the caller already holds the contents."""
+
+
+def _gear_url(account_name, character_name):
     params = {"accountName": account_name, "character": character_name}
+    return f"{API_BASE}/character-window/get-items?{parse.urlencode(params)}"
+
+
+def _gear_headers(poesessid=None):
     headers = {
         "User-Agent": "PoE Overlay Tool by Nick",
         "Accept": "application/json",
     }
-    query = parse.urlencode(params)
-    req = request.Request(f"{url}?{query}", headers=headers)
     if poesessid:
-        req.add_header("Cookie", f"POESESSID={poesessid}")
+        headers["Cookie"] = f"POESESSID={poesessid}"
+    return headers
 
-    with request.urlopen(req) as resp:
-        if resp.status != 200:
-            raise RuntimeError(f"Failed to fetch data: {resp.status}")
-        data = json.load(resp)
+
+def _parse_gear(data):
+    """Map a ``get-items`` response to the per-slot dicts used by the views."""
     gear = {}
     for item in data.get("items", []):
         slot = item.get("inventoryId")
@@ -32,51 +75,413 @@ def fetch_gear(account_name, character_name, poesessid=None):
     return gear
 
 
-def _api_request(url, token=None):
-    """Internal helper to perform an authenticated GET request."""
+def fetch_gear(account_name, character_name, poesessid=None):
+    url = _gear_url(account_name, character_name)
+    data = single_flight.do(
+        (url, poesessid),
+        _request_json,
+        url,
+        _gear_headers(poesessid),
+        "Failed to fetch data",
+    )
+    response_cache.flush()
+    return _parse_gear(data)
+
+
+def _request_json(
+    url, headers, error_message="Failed request", cache_scope=None, if_modified=False
+):
+    """GET ``url`` through the rate limit governor and decode the JSON body.
+
+    When ``cache_scope`` is given the request is made conditional on the
+    cached copy for that URL and scope, and a 304 is answered from the cache,
+    or with :class:`NotModified` if ``if_modified`` is set.
+    """
+    endpoint = endpoint_key(url)
+    key = cache_key(url, cache_scope) if cache_scope is not None else None
+    conditional = response_cache.conditional_headers(key) if key else {}
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        rate_limiter.acquire(endpoint)
+        try:
+            resp = default_client.get(url, {**headers, **conditional})
+        except Exception:
+            rate_limiter.release(endpoint)
+            raise
+        rate_limiter.update(endpoint, resp.headers, resp.status)
+        if resp.status == 429 and attempt < RATE_LIMIT_RETRIES:
+            continue
+        if resp.status == 304 and key:
+            if if_modified:
+                raise NotModified(url)
+            data = response_cache.load(key)
+            if data is not None:
+                return data
+            # The cached body went missing; ask again without validators.
+            conditional = {}
+            continue
+        if resp.status != 200:
+            raise RuntimeError(f"{error_message}: {resp.status}")
+        data = resp.json()
+        if key:
+            response_cache.store(key, resp.headers, resp.body, data)
+        return data
+    raise RuntimeError(f"{error_message}: {resp.status}")
+
+
+def _api_headers(token=None):
     headers = {
         "User-Agent": "ExiledOverlay",
         "Accept": "application/json",
     }
     if token:
         headers["Authorization"] = f"Bearer {token}"
-    req = request.Request(url, headers=headers)
-    with request.urlopen(req) as resp:
-        if resp.status != 200:
-            raise RuntimeError(f"Failed request: {resp.status}")
-        return json.load(resp)
+    return headers
+
+
+def _api_request(url, token=None, scope="", if_modified=False):
+    """Internal helper to perform an authenticated GET request.
+
+    Responses are cached per URL and token ``scope`` and revalidated on
+    later calls; with ``if_modified`` an unchanged response raises
+    :class:`NotModified` instead of returning the cached body. Concurrent
+    calls for the same URL and token share one request and its result.
+    """
+    return single_flight.do(
+        (url, token, scope, if_modified),
+        _request_json,
+        url,
+        _api_headers(token),
+        cache_scope=scope,
+        if_modified=if_modified,
+    )
+
+
+class _Tee:
+    """File wrapper that copies everything read into ``sink``."""
+
+    def __init__(self, fp, sink):
+        self.fp = fp
+        self.sink = sink
+
+    def read(self, size=-1):
+        data = self.fp.read(size)
+        if self.sink is not None:
+            self.sink.write(data)
+        return data
+
+
+def _iter_api_items(url, token=None, scope="", if_modified=False):
+    """Yield the ``items`` of an API response one at a time.
+
+    The body is parsed incrementally while it arrives and copied into the
+    response cache, so a large stash tab never exists in memory as a whole.
+    Like :func:`_api_request` the request is rate limited and revalidated,
+    and ``if_modified`` raises :class:`NotModified` for an unchanged body.
+    """
+    endpoint = endpoint_key(url)
+    key = cache_key(url, scope)
+    headers = _api_headers(token)
+    conditional = response_cache.conditional_headers(key)
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        rate_limiter.acquire(endpoint)
+        with ExitStack() as stack:
+            try:
+                resp = stack.enter_context(
+                    default_client.stream(url, {**headers, **conditional})
+                )
+            except Exception:
+                rate_limiter.release(endpoint)
+                raise
+            rate_limiter.update(endpoint, resp.headers, resp.status)
+            if resp.status == 200:
+                spool = response_cache.spool(key) if response_cache.cacheable(resp.headers) else None
+                body = _Tee(resp.fp, spool)
+                try:
+                    yield from iter_array(body)
+                    body.read()
+                except BaseException:
+                    if spool is not None:
+                        spool.close()
+                        os.remove(spool.name)
+                    raise
+                response_cache.commit(key, resp.headers, spool)
+                return
+            resp.fp.read()
+        if resp.status == 429 and attempt < RATE_LIMIT_RETRIES:
+            continue
+        if resp.status == 304:
+            if if_modified:
+                raise NotModified(url)
+            cached = response_cache.open_body(key)
+            if cached is None:
+                # The cached body went missing; ask again without validators.
+                conditional = {}
+                continue
+            with cached:
+                yield from iter_array(cached)
+            return
+        raise RuntimeError(f"Failed request: {resp.status}")
+    raise RuntimeError(f"Failed request: {resp.status}")
+
+
+def index_tab(tab_data, keep_items=True):
+    """Index a decoded stash tab response.
+
+    Returns the tab's items (``None`` unless ``keep_items``) and its
+    :class:`TabIndex`.
+    """
+    items = tab_data.get("items", [])
+    tab_index = TabIndex()
+    for item in items:
+        tab_index.add_item(item)
+    return (items if keep_items else None), tab_index
+
+
+def _stream_tab(url, token, if_modified=False):
+    """Stream a stash tab into a :class:`TabIndex` without keeping its items."""
+    tab_index = TabIndex()
+    for item in _iter_api_items(url, token, STASH_SCOPE, if_modified=if_modified):
+        tab_index.add_item(item)
+    return None, tab_index
+
+
+def _tab_fingerprint(tab):
+    """Return a digest of a tab's entry in the ``/profile/stash-tabs`` listing.
+
+    The listing describes a tab, not its contents, so an unchanged
+    fingerprint only means the tab can be revalidated instead of downloaded.
+    """
+    encoded = json.dumps(tab, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class StashSnapshot:
+    """Contents of every stash tab in a league, downloaded in one sweep.
+
+    All stash queries are answered from the snapshot so several views asking
+    for counts cost a single download of each tab until ``ttl`` runs out.
+    Every item is added to an inverted :class:`StashIndex` while its tab is
+    parsed, so count queries are dictionary lookups. In ``streaming`` mode the
+    items themselves are dropped afterwards, otherwise they stay available
+    through :meth:`iter_items`.
+    """
+
+    def __init__(
+        self,
+        token,
+        league,
+        ttl=SNAPSHOT_TTL,
+        workers=STASH_WORKERS,
+        streaming=STREAM_TABS,
+    ):
+        self.token = token
+        self.league = league
+        self.ttl = ttl
+        self.workers = workers
+        self.streaming = streaming
+        self.tabs = []
+        # tab id -> items, only filled when not streaming
+        self.items = {}
+        self.index = StashIndex()
+        # tab id -> error message for tabs that failed in the last sweep
+        self.errors = {}
+        # tab id -> listing fingerprint of the tab contents we hold
+        self.fingerprints = {}
+        # tab ids whose contents were downloaded by the last refresh
+        self.last_fetched = []
+        self.fetched_at = None
+        # Held by whichever caller, blocking or async, is refreshing the
+        # snapshot, so two sweeps never run at once.
+        self.refresh_lock = threading.Lock()
+        # Held while results are merged, which both the blocking and the
+        # async refresh paths do.
+        self._apply_lock = threading.Lock()
+
+    def is_stale(self):
+        if self.fetched_at is None:
+            return True
+        return time.monotonic() - self.fetched_at >= self.ttl
+
+    def tabs_url(self):
+        return f"{API_BASE}/profile/stash-tabs?league={parse.quote(self.league)}"
+
+    def tab_url(self, tab_id):
+        return f"{API_BASE}/stash/{tab_id}?league={parse.quote(self.league)}"
+
+    def _fetch_tab(self, tab_id, known=False):
+        """Download a tab and return its items (or ``None``) and its index.
+
+        Returns ``None`` for a ``known`` tab whose contents did not change.
+        """
+        url = self.tab_url(tab_id)
+        try:
+            if self.streaming:
+                return single_flight.do(
+                    ("stream", url, self.token, STASH_SCOPE, known),
+                    _stream_tab,
+                    url,
+                    self.token,
+                    if_modified=known,
+                )
+            return index_tab(_api_request(url, self.token, STASH_SCOPE, if_modified=known))
+        except NotModified:
+            return None
+
+    def _fetch_tabs(self, plan):
+        """Fetch every ``(tab_id, known)`` in ``plan``.
+
+        Returns a dict of results, ``None`` for unchanged tabs, or exceptions.
+        """
+        results = {}
+        if self.workers > 1 and len(plan) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    tab_id: pool.submit(self._fetch_tab, tab_id, known) for tab_id, known in plan
+                }
+            for tab_id, future in futures.items():
+                try:
+                    results[tab_id] = future.result()
+                except Exception as exc:
+                    results[tab_id] = exc
+        else:
+            for tab_id, known in plan:
+                try:
+                    results[tab_id] = self._fetch_tab(tab_id, known)
+                except Exception as exc:
+                    results[tab_id] = exc
+        return results
+
+    def refresh(self, full=False):
+        """Sync the snapshot with the stash.
+
+        Every tab is revalidated with a conditional request, so a tab whose
+        contents did not change costs a 304 without a body. Tabs whose
+        listing entry is unchanged since the previous sweep are not even
+        parsed again then; ``full`` parses every tab. Tabs are fetched on up
+        to ``workers`` threads. A tab that fails is recorded in ``errors``,
+        keeps the items from the previous sweep and is retried on the next
+        refresh.
+        """
+        try:
+            listing = _api_request(self.tabs_url(), self.token, STASH_SCOPE)
+            self.apply(listing, self._fetch_tabs(self.plan(listing, full)))
+        finally:
+            # One index write for every tab the sweep stored.
+            response_cache.flush()
+
+    def plan(self, listing, full=False):
+        """Return ``(tab_id, known)`` for every tab in ``listing``.
+
+        ``known`` tabs are already indexed and their listing entry did not
+        change, so their cached contents need not be read again if the
+        server reports them unchanged.
+        """
+        return [
+            (
+                tab["id"],
+                not full and self.fingerprints.get(tab["id"]) == _tab_fingerprint(tab),
+            )
+            for tab in listing.get("tabs", [])
+        ]
+
+    def apply(self, listing, results):
+        """Merge fetched tabs into the snapshot.
+
+        ``results`` maps tab ids to an ``(items, TabIndex)`` pair, ``None``
+        for a tab that did not change, or the exception raised while
+        fetching it. Tabs missing from ``results`` keep their contents.
+        """
+        tabs = listing.get("tabs", [])
+        fingerprints = {t["id"]: _tab_fingerprint(t) for t in tabs}
+
+        with self._apply_lock:
+            # Merge in listing order so results never depend on completion order.
+            items = {}
+            errors = {}
+            for tab_id in fingerprints:
+                result = results.get(tab_id)
+                if isinstance(result, Exception):
+                    errors[tab_id] = str(result)
+                    fingerprints[tab_id] = None
+                    result = None
+                if result is None:
+                    items[tab_id] = self.items.get(tab_id, [])
+                else:
+                    items[tab_id] = result[0] or []
+                    self.index.replace_tab(tab_id, result[1])
+            for tab_id in self.index.tab_ids():
+                if tab_id not in fingerprints:
+                    self.index.remove_tab(tab_id)
+            self.tabs = tabs
+            self.items = items
+            self.errors = errors
+            self.fingerprints = fingerprints
+            self.last_fetched = [
+                tab_id for tab_id in fingerprints if isinstance(results.get(tab_id), tuple)
+            ]
+            self.fetched_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Refresh the snapshot if it is older than its TTL and return it."""
+        with self.refresh_lock:
+            if self.is_stale():
+                self.refresh()
+        return self
+
+    def iter_items(self):
+        """Yield every stored item; empty in ``streaming`` mode."""
+        for tab in self.tabs:
+            yield from self.items.get(tab["id"], [])
+
+    def currency_counts(self, currencies):
+        return self.index.counts(currencies)
+
+    def item_count(self, item_name):
+        return self.index.count(item_name)
+
+    def item_locations(self, item_name):
+        """Return the tab and position of every stack of ``item_name``."""
+        return self.index.locations(item_name)
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def shared_snapshot(token, league, ttl=SNAPSHOT_TTL):
+    """Return the snapshot for ``league`` shared by all callers, as is."""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(league)
+        if snapshot is None:
+            snapshot = _snapshots[league] = StashSnapshot(token, league, ttl)
+        snapshot.token = token
+        snapshot.ttl = ttl
+    return snapshot
+
+
+def flush_response_cache():
+    """Write the response cache index; used when the overlay quits."""
+    response_cache.flush()
+
+
+def get_stash_snapshot(token, league, ttl=SNAPSHOT_TTL):
+    """Return the shared, up to date stash snapshot for ``league``."""
+    return shared_snapshot(token, league, ttl).ensure_fresh()
 
 
 def fetch_currency(token, league, currencies):
     """Return currency counts for the logged in account."""
-    base = "https://api.pathofexile.com"
-    tabs_url = f"{base}/profile/stash-tabs?league={parse.quote(league)}"
-    data = _api_request(tabs_url, token)
-    tab_ids = [t["id"] for t in data.get("tabs", [])]
-
-    counts = {c: 0 for c in currencies}
-    for tab_id in tab_ids:
-        items_url = f"{base}/stash/{tab_id}?league={parse.quote(league)}"
-        tab_data = _api_request(items_url, token)
-        for item in tab_data.get("items", []):
-            name = item.get("typeLine")
-            if name in counts:
-                counts[name] += int(item.get("stackSize", 1))
-    return counts
+    return get_stash_snapshot(token, league).currency_counts(currencies)
 
 
 def fetch_item_count(token, league, item_name):
     """Return the total count of ``item_name`` across all stashes."""
-    base = "https://api.pathofexile.com"
-    tabs_url = f"{base}/profile/stash-tabs?league={parse.quote(league)}"
-    data = _api_request(tabs_url, token)
-    tab_ids = [t["id"] for t in data.get("tabs", [])]
-
-    total = 0
-    for tab_id in tab_ids:
-        items_url = f"{base}/stash/{tab_id}?league={parse.quote(league)}"
-        tab_data = _api_request(items_url, token)
-        for item in tab_data.get("items", []):
-            if item.get("typeLine") == item_name or item.get("name") == item_name:
-                total += int(item.get("stackSize", 1))
-    return total
+    return get_stash_snapshot(token, league).item_count(item_name)
+
+
+def fetch_item_counts(token, league, item_names):
+    """Return the total count of each of ``item_names`` across all stashes.
+
+    All names are answered from one stash sweep.
+    """
+    return get_stash_snapshot(token, league).index.counts(item_names)
@@ -0,0 +1,386 @@
+# api/poe_async.py
+"""asyncio client for the PoE API.
+
+Mirrors :func:`api.poe_api.fetch_gear`, :func:`~api.poe_api.fetch_currency`
+and :func:`~api.poe_api.fetch_item_count` as coroutines so many requests
+can be in flight from a single event loop instead of one thread each. The
+coroutines reuse the parsing, stash snapshot, response cache and rate limit
+governor of :mod:`api.poe_api`, so blocking and async callers share one
+budget and one view of the stash.
+
+:class:`AsyncLoopThread` runs an event loop next to the Qt one; the job
+runner in :mod:`ui.job_runner` uses it to deliver coroutine results to the
+GUI thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.parser
+import functools
+import gzip
+import http.client
+import ssl
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+from api import poe_api
+from api.http_cache import cache_key
+from api.http_client import DEFAULT_TIMEOUT, Response
+from api.rate_limit import endpoint_key
+from api.single_flight import AsyncSingleFlight
+
+MAX_CONNECTIONS_PER_HOST = 8
+
+
+class AsyncHTTPClient:
+    """Minimal HTTP/1.1 client on asyncio streams with keep-alive pooling.
+
+    At most ``max_per_host`` connections are opened per host; further
+    requests wait for a free connection, so hundreds of requests can be
+    queued without opening hundreds of sockets.
+    """
+
+    def __init__(self, max_per_host: int = MAX_CONNECTIONS_PER_HOST, timeout: float = DEFAULT_TIMEOUT):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle: dict[tuple, list[tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self._limits: dict[tuple, asyncio.Semaphore] = {}
+        self._ssl = ssl.create_default_context()
+        self.connections_opened = 0
+
+    async def _connect(self, key):
+        scheme, host, port = key
+        if scheme == "https":
+            opening = asyncio.open_connection(host, port or 443, ssl=self._ssl)
+        else:
+            opening = asyncio.open_connection(host, port or 80)
+        conn = await asyncio.wait_for(opening, self.timeout)
+        self.connections_opened += 1
+        return conn
+
+    @staticmethod
+    async def _read_body(reader, headers, status, method):
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            return b"", True
+        if headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0], 16)
+                if size == 0:
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return b"".join(chunks), True
+        length = headers.get("Content-Length")
+        if length is not None:
+            return await reader.readexactly(int(length)), True
+        return await reader.read(), False
+
+    async def _exchange(self, conn, method, host, path, headers, body):
+        reader, writer = conn
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        status = int(status_line.split()[1])
+        raw_headers = []
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            raw_headers.append(line.decode("latin-1"))
+        parsed = email.parser.Parser(_class=http.client.HTTPMessage).parsestr("".join(raw_headers))
+        data, reusable = await self._read_body(reader, parsed, status, method)
+        if parsed.get("Connection", "").lower() == "close":
+            reusable = False
+        return Response(status, parsed, data), reusable
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict | None = None,
+        body: bytes | None = None,
+    ) -> Response:
+        """Send a request and return the decoded response."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        host = parts.netloc
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip")
+        headers.setdefault("Connection", "keep-alive")
+
+        limit = self._limits.setdefault(key, asyncio.Semaphore(self.max_per_host))
+        async with limit:
+            while True:
+                idle = self._idle.get(key)
+                reused = bool(idle)
+                conn = idle.pop() if reused else await self._connect(key)
+                try:
+                    resp, reusable = await asyncio.wait_for(
+                        self._exchange(conn, method, host, path, headers, body), self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn[1].close()
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    conn[1].close()
+                    raise
+                break
+            if reusable:
+                self._idle.setdefault(key, []).append(conn)
+            else:
+                conn[1].close()
+
+        if resp.headers.get("Content-Encoding", "").lower() == "gzip":
+            resp.body = gzip.decompress(resp.body)
+        return resp
+
+    async def get(self, url: str, headers: dict | None = None) -> Response:
+        return await self.request("GET", url, headers)
+
+    async def close(self) -> None:
+        """Close every idle connection."""
+        pools = list(self._idle.values())
+        self._idle.clear()
+        for idle in pools:
+            for _reader, writer in idle:
+                writer.close()
+
+
+async def _in_executor(fn, *args, **kwargs):
+    """Run blocking ``fn``, such as response cache file I/O, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+
+def _decode_and_store(cache, key, resp, remember):
+    data = resp.json()
+    if key:
+        cache.store(key, resp.headers, resp.body, data, remember=remember)
+    return data
+
+
+async def _request_json(
+    client,
+    url,
+    headers,
+    error_message="Failed request",
+    cache_scope=None,
+    if_modified=False,
+    remember=True,
+):
+    """Async counterpart of :func:`api.poe_api._request_json`.
+
+    Response cache reads and writes run on the loop's executor. With
+    ``remember`` unset decoded bodies are not kept in the cache's memory.
+    """
+    cache = poe_api.response_cache
+    limiter = poe_api.rate_limiter
+    endpoint = endpoint_key(url)
+    key = cache_key(url, cache_scope) if cache_scope is not None else None
+    conditional = await _in_executor(cache.conditional_headers, key) if key else {}
+    for attempt in range(poe_api.RATE_LIMIT_RETRIES + 1):
+        await limiter.acquire_async(endpoint)
+        try:
+            resp = await client.get(url, {**headers, **conditional})
+        except BaseException:
+            limiter.release(endpoint)
+            raise
+        limiter.update(endpoint, resp.headers, resp.status)
+        if resp.status == 429 and attempt < poe_api.RATE_LIMIT_RETRIES:
+            continue
+        if resp.status == 304 and key:
+            if if_modified:
+                raise poe_api.NotModified(url)
+            data = await _in_executor(cache.load, key, remember=remember)
+            if data is not None:
+                return data
+            conditional = {}
+            continue
+        if resp.status != 200:
+            raise RuntimeError(f"{error_message}: {resp.status}")
+        return await _in_executor(_decode_and_store, cache, key, resp, remember)
+    raise RuntimeError(f"{error_message}: {resp.status}")
+
+
+async def _acquire_thread_lock(lock):
+    """Acquire a :class:`threading.Lock` without blocking the event loop."""
+    if lock.acquire(blocking=False):
+        return
+    acquiring = asyncio.get_running_loop().run_in_executor(None, lock.acquire)
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        # The executor still takes the lock; give it back once it has.
+        acquiring.add_done_callback(lambda _: lock.release())
+        raise
+
+
+class AsyncPoeClient:
+    """Coroutine versions of the blocking helpers in :mod:`api.poe_api`."""
+
+    def __init__(self, http: AsyncHTTPClient | None = None):
+        self.http = http or AsyncHTTPClient()
+        self._snapshot_locks: dict[str, asyncio.Lock] = {}
+        # Concurrent coroutines asking for the same URL and token share one
+        # request, like poe_api.single_flight does for threads.
+        self.single_flight = AsyncSingleFlight()
+
+    async def _api_request(self, url, token=None, scope="", if_modified=False, remember=True):
+        return await self.single_flight.do(
+            (url, token, scope, if_modified, remember),
+            _request_json,
+            self.http,
+            url,
+            poe_api._api_headers(token),
+            cache_scope=scope,
+            if_modified=if_modified,
+            remember=remember,
+        )
+
+    async def fetch_gear(self, account_name, character_name, poesessid=None):
+        url = poe_api._gear_url(account_name, character_name)
+        data = await self.single_flight.do(
+            (url, poesessid),
+            _request_json,
+            self.http,
+            url,
+            poe_api._gear_headers(poesessid),
+            "Failed to fetch data",
+        )
+        await _in_executor(poe_api.response_cache.flush)
+        return poe_api._parse_gear(data)
+
+    async def _fetch_tab(self, snapshot, tab_id, known=False):
+        try:
+            # Streaming snapshots must not keep decoded tabs in the
+            # response cache's memory either.
+            data = await self._api_request(
+                snapshot.tab_url(tab_id),
+                snapshot.token,
+                poe_api.STASH_SCOPE,
+                if_modified=known,
+                remember=not snapshot.streaming,
+            )
+        except poe_api.NotModified:
+            return None
+        return poe_api.index_tab(data, keep_items=not snapshot.streaming)
+
+    async def refresh_snapshot(self, snapshot, full=False):
+        """Sync ``snapshot`` with every tab revalidated concurrently."""
+        try:
+            listing = await self._api_request(
+                snapshot.tabs_url(), snapshot.token, poe_api.STASH_SCOPE
+            )
+            plan = snapshot.plan(listing, full)
+            outcomes = await asyncio.gather(
+                *(self._fetch_tab(snapshot, tab_id, known) for tab_id, known in plan),
+                return_exceptions=True,
+            )
+            results = {}
+            for (tab_id, _), outcome in zip(plan, outcomes):
+                if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                    raise outcome
+                results[tab_id] = outcome
+            snapshot.apply(listing, results)
+        finally:
+            await _in_executor(poe_api.response_cache.flush)
+        return snapshot
+
+    async def get_stash_snapshot(self, token, league, ttl=poe_api.SNAPSHOT_TTL):
+        """Return the shared stash snapshot, refreshing it if it is stale.
+
+        Coroutines queue on an asyncio lock; the one refreshing also holds
+        the snapshot's ``refresh_lock``, so it never overlaps a blocking
+        :meth:`~api.poe_api.StashSnapshot.ensure_fresh`.
+        """
+        snapshot = poe_api.shared_snapshot(token, league, ttl)
+        lock = self._snapshot_locks.setdefault(league, asyncio.Lock())
+        async with lock:
+            if snapshot.is_stale():
+                await _acquire_thread_lock(snapshot.refresh_lock)
+                try:
+                    # A blocking caller may have refreshed it meanwhile.
+                    if snapshot.is_stale():
+                        await self.refresh_snapshot(snapshot)
+                finally:
+                    snapshot.refresh_lock.release()
+        return snapshot
+
+    async def fetch_currency(self, token, league, currencies):
+        snapshot = await self.get_stash_snapshot(token, league)
+        return snapshot.currency_counts(currencies)
+
+    async def fetch_item_count(self, token, league, item_name):
+        snapshot = await self.get_stash_snapshot(token, league)
+        return snapshot.item_count(item_name)
+
+    async def fetch_item_counts(self, token, league, item_names):
+        snapshot = await self.get_stash_snapshot(token, league)
+        return snapshot.index.counts(item_names)
+
+    async def close(self):
+        await self.http.close()
+
+
+class AsyncLoopThread:
+    """An asyncio event loop running on a daemon thread.
+
+    Lets code running on another loop, such as Qt's, schedule coroutines
+    and receive their results through :class:`concurrent.futures.Future`.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="poe-async", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+_loop_thread = None
+_client = None
+_shared_lock = threading.Lock()
+
+
+def loop_thread() -> AsyncLoopThread:
+    """Return the background event loop shared by the overlay."""
+    global _loop_thread
+    with _shared_lock:
+        if _loop_thread is None:
+            _loop_thread = AsyncLoopThread()
+        return _loop_thread
+
+
+def client() -> AsyncPoeClient:
+    """Return the client bound to :func:`loop_thread`'s event loop."""
+    global _client
+    with _shared_lock:
+        if _client is None:
+            _client = AsyncPoeClient()
+        return _client
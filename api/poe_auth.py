@@ -4,28 +4,41 @@
 This module handles obtaining and refreshing OAuth tokens using
 Path of Exile's official API. Tokens are stored on disk with
 restricted permissions so only the user can read them.
+
+The token file holds one token per client and scope set. A view asks for
+the scope it needs and is served by any stored token whose scopes include
+it, so a single login with :data:`OVERLAY_SCOPE` covers every view.
 """
 
 from __future__ import annotations
 
+import copy
 import json
 import os
 import secrets
+import threading
 import webbrowser
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import time
 from urllib.parse import urlencode, urlparse, parse_qs
-from urllib import request
 import hashlib
 import base64
 
+from api.http_client import default_client
+
 AUTH_URL = "https://www.pathofexile.com/oauth/authorize"
 TOKEN_URL = "https://www.pathofexile.com/oauth/token"
 DEFAULT_SCOPE = "account:profile"
+# Every scope used by the overlay's views, requested together on login.
+OVERLAY_SCOPE = "account:profile account:stashes"
 TOKEN_FILE = os.path.expanduser("~/.exiledoverlay_tokens.json")
 CREDENTIALS_FILE = os.path.expanduser("~/.exiledoverlay_credentials.json")
 CALLBACK_PORT = 8765
 LOGIN_TIMEOUT = 120  # seconds to wait for browser callback
+CALLBACK_POLL = 0.25  # seconds between checks for cancellation during login
+REFRESH_MARGIN = 300  # renew tokens this many seconds before they expire
+REFRESH_RETRY = 30  # seconds before retrying a failed background refresh
+REFRESH_POLL = 60  # re-check the token file at least this often
 
 
 class _CallbackHandler(BaseHTTPRequestHandler):
@@ -63,16 +76,189 @@ class _AuthServer(HTTPServer):
         self.state = state
         self.error: str | None = None
 
+    @property
+    def redirect_uri(self) -> str:
+        return f"http://localhost:{self.server_address[1]}/callback"
+
+
+class LoginCancelled(RuntimeError):
+    """Raised when a login is cancelled before the browser callback."""
+
+
+class NotLoggedIn(RuntimeError):
+    """Raised when no stored token grants the requested scope."""
+
+
+def _open_callback_server(state: str) -> _AuthServer:
+    """Listen for the OAuth callback on ``CALLBACK_PORT``.
+
+    Falls back to a port chosen by the OS when ``CALLBACK_PORT`` is taken,
+    e.g. by a second overlay instance still waiting for its own login.
+    """
+    try:
+        return _AuthServer(("localhost", CALLBACK_PORT), state)
+    except OSError:
+        pass
+    try:
+        return _AuthServer(("localhost", 0), state)
+    except OSError as exc:  # pragma: no cover - depends on system state
+        raise RuntimeError("No port available for the login callback") from exc
+
+
+def _wait_for_code(httpd: _AuthServer, cancel: threading.Event | None = None) -> str:
+    """Serve callback requests until a code arrives, an error or ``cancel``."""
+    with httpd:
+        httpd.timeout = CALLBACK_POLL
+        start = time.monotonic()
+        while httpd.code is None and httpd.error is None:
+            if cancel is not None and cancel.is_set():
+                raise LoginCancelled("Login cancelled")
+            if time.monotonic() - start > LOGIN_TIMEOUT:
+                raise TimeoutError("Login timed out waiting for callback")
+            httpd.handle_request()
+        if httpd.error:
+            raise RuntimeError(httpd.error)
+        return httpd.code
+
+
+def _post_token(data: dict, error_message: str) -> dict:
+    """POST form encoded ``data`` to the token endpoint and decode the reply."""
+    resp = default_client.post(
+        TOKEN_URL,
+        urlencode(data).encode(),
+        headers={
+            "User-Agent": "ExiledOverlay",
+            "Content-Type": "application/x-www-form-urlencoded",
+        },
+    )
+    if resp.status != 200:
+        raise RuntimeError(f"{error_message}: {resp.status}")
+    return resp.json()
+
+
+class _TokenCache:
+    """Process wide copy of a JSON file, re-read only when it changes.
+
+    Entries are validated against the file's ``stat`` signature (mtime, size
+    and inode), so a token written by another process is still picked up
+    while repeated lookups avoid opening and parsing the file.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._path: str | None = None
+        self._signature: tuple | None = None
+        self._data = None
+        self.reads = 0
+
+    @staticmethod
+    def _stat(path: str) -> tuple | None:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self, path: str):
+        with self._lock:
+            signature = self._stat(path)
+            if signature is None:
+                self._path, self._signature, self._data = path, None, None
+                return None
+            if path != self._path or signature != self._signature:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except FileNotFoundError:
+                    return None
+                except json.JSONDecodeError:
+                    # Half written by a process that doesn't replace the file
+                    # atomically: keep the last good copy and retry next time.
+                    return copy.deepcopy(self._data) if path == self._path else None
+                self.reads += 1
+                self._path, self._signature, self._data = path, signature, data
+            return copy.deepcopy(self._data)
+
+    def put(self, path: str, data) -> None:
+        with self._lock:
+            self._path = path
+            self._signature = self._stat(path)
+            self._data = copy.deepcopy(data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._path = self._signature = self._data = None
+
+
+_token_cache = _TokenCache()
+# Serializes read-modify-write of the token file between threads.
+_save_lock = threading.Lock()
+
 
 def _get_token_path() -> str:
     return TOKEN_FILE
 
 
+def _scopes(scope: str | None) -> frozenset[str]:
+    return frozenset((scope or "").split())
+
+
+def _granted(token: dict) -> frozenset[str]:
+    """Return the scopes ``token`` was granted.
+
+    Tokens saved before scopes were recorded came from a login with
+    :data:`DEFAULT_SCOPE`, the only scope the overlay asked for then.
+    """
+    return _scopes(token.get("scope") or DEFAULT_SCOPE)
+
+
+def _token_identity(token: dict) -> tuple:
+    """Return the key a token is stored under: client and scope set."""
+    return (bool(token.get("public")), token.get("client_id"), _granted(token))
+
+
+def _covers(token: dict, scope: str | None) -> bool:
+    """Return ``True`` if ``token`` was granted every scope in ``scope``."""
+    return _scopes(scope) <= _granted(token)
+
+
+def _load_tokens() -> list[dict]:
+    """Return every stored token, oldest first."""
+    data = _token_cache.get(_get_token_path())
+    if not data:
+        return []
+    if "tokens" in data:
+        return data["tokens"]
+    # Single token written by an older version.
+    return [data]
+
+
 def _save_token(token: dict) -> None:
-    path = _get_token_path()
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(token, f)
-    os.chmod(path, 0o600)
+    """Store ``token``, replacing tokens it makes redundant.
+
+    A stored token for the same client is dropped when the new one has the
+    same or a wider scope set, so logging in with a superset scope collapses
+    the store to one token.
+    """
+    public, client_id, scopes = _token_identity(token)
+    with _save_lock:
+        tokens = [
+            t
+            for t in _load_tokens()
+            if _token_identity(t)[:2] != (public, client_id) or not _token_identity(t)[2] <= scopes
+        ]
+        tokens.append(token)
+        data = {"tokens": tokens}
+        path = _get_token_path()
+        # Write a private temp file and swap it in, so readers never see a
+        # partial file and the tokens are never world readable.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, path)
+        _token_cache.put(path, data)
 
 
 def _get_credentials_path() -> str:
@@ -99,13 +285,20 @@ def _load_credentials() -> tuple[str, str] | None:
         return None
 
 
-def load_token() -> dict | None:
-    """Load a previously saved OAuth token, if available."""
-    try:
-        with open(_get_token_path(), "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
+def load_token(scope: str | None = None, client_id: str | None = None) -> dict | None:
+    """Load a previously saved OAuth token, if available.
+
+    With ``scope`` only tokens granted all of those scopes are considered and
+    with ``client_id`` only tokens of that public client. The most recently
+    saved match is returned. The file is only parsed again when it changed
+    since the last call.
+    """
+    for token in reversed(_load_tokens()):
+        if client_id is not None and (token.get("client_id") != client_id or not token.get("public")):
+            continue
+        if scope is None or _covers(token, scope):
+            return token
+    return None
 
 
 def _get_client_credentials() -> tuple[str, str]:
@@ -130,12 +323,17 @@ def _get_client_credentials() -> tuple[str, str]:
     raise RuntimeError("POE_CLIENT_ID and POE_CLIENT_SECRET must be set")
 
 
-def login(scope: str = DEFAULT_SCOPE) -> dict:
-    """Perform OAuth login flow and return the obtained token."""
+def login(scope: str = DEFAULT_SCOPE, cancel: threading.Event | None = None) -> dict:
+    """Perform OAuth login flow and return the obtained token.
+
+    Blocks until the browser calls back. Setting ``cancel`` from another
+    thread aborts the wait with :class:`LoginCancelled`.
+    """
     client_id, client_secret = _get_client_credentials()
 
-    redirect_uri = f"http://localhost:{CALLBACK_PORT}/callback"
     state = secrets.token_urlsafe(16)
+    httpd = _open_callback_server(state)
+    redirect_uri = httpd.redirect_uri
 
     params = {
         "client_id": client_id,
@@ -146,24 +344,7 @@ def login(scope: str = DEFAULT_SCOPE) -> dict:
     }
     url = f"{AUTH_URL}?{urlencode(params)}"
     webbrowser.open(url)
-
-    try:
-        httpd = _AuthServer(("localhost", CALLBACK_PORT), state)
-    except OSError as exc:  # pragma: no cover - depends on system state
-        raise RuntimeError(
-            f"Port {CALLBACK_PORT} is unavailable"
-        ) from exc
-
-    with httpd:
-        httpd.timeout = 1
-        start = time.monotonic()
-        while httpd.code is None and httpd.error is None:
-            if time.monotonic() - start > LOGIN_TIMEOUT:
-                raise TimeoutError("Login timed out waiting for callback")
-            httpd.handle_request()
-        if httpd.error:
-            raise RuntimeError(httpd.error)
-        code = httpd.code
+    code = _wait_for_code(httpd, cancel)
 
     data = {
         "grant_type": "authorization_code",
@@ -173,31 +354,32 @@ def login(scope: str = DEFAULT_SCOPE) -> dict:
     }
     if client_secret:
         data["client_secret"] = client_secret
-    req = request.Request(
-        TOKEN_URL,
-        data=urlencode(data).encode(),
-        headers={"User-Agent": "ExiledOverlay"},
-    )
-    with request.urlopen(req) as resp:
-        if resp.status != 200:
-            raise RuntimeError(f"Token request failed: {resp.status}")
-        token = json.load(resp)
+    token = _post_token(data, "Token request failed")
 
     if "access_token" not in token or "refresh_token" not in token:
         raise RuntimeError("Token response missing required fields")
 
     token["expires_at"] = time.time() + token.get("expires_in", 0)
+    token.setdefault("scope", scope)
     _save_token(token)
     return token
 
 
-def login_public(account_name: str, scope: str = DEFAULT_SCOPE) -> dict:
-    """Perform OAuth login using the public client flow."""
+def login_public(
+    account_name: str,
+    scope: str = DEFAULT_SCOPE,
+    cancel: threading.Event | None = None,
+) -> dict:
+    """Perform OAuth login using the public client flow.
+
+    ``cancel`` works as in :func:`login`.
+    """
     if not account_name:
         raise ValueError("account_name required")
 
-    redirect_uri = f"http://localhost:{CALLBACK_PORT}/callback"
     state = secrets.token_urlsafe(16)
+    httpd = _open_callback_server(state)
+    redirect_uri = httpd.redirect_uri
     verifier = secrets.token_urlsafe(64)
     challenge = base64.urlsafe_b64encode(
         hashlib.sha256(verifier.encode()).digest()
@@ -214,24 +396,7 @@ def login_public(account_name: str, scope: str = DEFAULT_SCOPE) -> dict:
     }
     url = f"{AUTH_URL}?{urlencode(params)}"
     webbrowser.open(url)
-
-    try:
-        httpd = _AuthServer(("localhost", CALLBACK_PORT), state)
-    except OSError as exc:  # pragma: no cover - depends on system state
-        raise RuntimeError(
-            f"Port {CALLBACK_PORT} is unavailable"
-        ) from exc
-
-    with httpd:
-        httpd.timeout = 1
-        start = time.monotonic()
-        while httpd.code is None and httpd.error is None:
-            if time.monotonic() - start > LOGIN_TIMEOUT:
-                raise TimeoutError("Login timed out waiting for callback")
-            httpd.handle_request()
-        if httpd.error:
-            raise RuntimeError(httpd.error)
-        code = httpd.code
+    code = _wait_for_code(httpd, cancel)
 
     data = {
         "grant_type": "authorization_code",
@@ -240,20 +405,13 @@ def login_public(account_name: str, scope: str = DEFAULT_SCOPE) -> dict:
         "redirect_uri": redirect_uri,
         "code_verifier": verifier,
     }
-    req = request.Request(
-        TOKEN_URL,
-        data=urlencode(data).encode(),
-        headers={"User-Agent": "ExiledOverlay"},
-    )
-    with request.urlopen(req) as resp:
-        if resp.status != 200:
-            raise RuntimeError(f"Token request failed: {resp.status}")
-        token = json.load(resp)
+    token = _post_token(data, "Token request failed")
 
     if "access_token" not in token or "refresh_token" not in token:
         raise RuntimeError("Token response missing required fields")
 
     token["expires_at"] = time.time() + token.get("expires_in", 0)
+    token.setdefault("scope", scope)
     token["client_id"] = account_name
     token["public"] = True
     _save_token(token)
@@ -271,20 +429,14 @@ def refresh_token(token: dict) -> dict:
     }
     if client_secret:
         data["client_secret"] = client_secret
-    req = request.Request(
-        TOKEN_URL,
-        data=urlencode(data).encode(),
-        headers={"User-Agent": "ExiledOverlay"},
-    )
-    with request.urlopen(req) as resp:
-        if resp.status != 200:
-            raise RuntimeError(f"Token refresh failed: {resp.status}")
-        new_token = json.load(resp)
+    new_token = _post_token(data, "Token refresh failed")
 
     if "access_token" not in new_token or "refresh_token" not in new_token:
         raise RuntimeError("Token refresh response missing required fields")
 
     new_token["expires_at"] = time.time() + new_token.get("expires_in", 0)
+    if token.get("scope"):
+        new_token.setdefault("scope", token["scope"])
     _save_token(new_token)
     return new_token
 
@@ -300,39 +452,62 @@ def refresh_token_public(token: dict) -> dict:
         "refresh_token": token.get("refresh_token"),
         "client_id": client_id,
     }
-    req = request.Request(
-        TOKEN_URL,
-        data=urlencode(data).encode(),
-        headers={"User-Agent": "ExiledOverlay"},
-    )
-    with request.urlopen(req) as resp:
-        if resp.status != 200:
-            raise RuntimeError(f"Token refresh failed: {resp.status}")
-        new_token = json.load(resp)
+    new_token = _post_token(data, "Token refresh failed")
 
     if "access_token" not in new_token or "refresh_token" not in new_token:
         raise RuntimeError("Token refresh response missing required fields")
 
     new_token["expires_at"] = time.time() + new_token.get("expires_in", 0)
+    if token.get("scope"):
+        new_token.setdefault("scope", token["scope"])
     new_token["client_id"] = client_id
     new_token["public"] = True
     _save_token(new_token)
     return new_token
 
 
-def ensure_valid_token_public(account_name: str, scope: str = DEFAULT_SCOPE) -> dict:
-    """Return a valid token for a public client, refreshing or logging in."""
-    token = load_token()
-    if (
-        token is None
-        or token.get("client_id") != account_name
-        or not token.get("public")
-    ):
-        return login_public(account_name, scope)
+_refresh_lock = threading.Lock()
+
+
+def _refresh_once(token: dict) -> dict:
+    """Refresh ``token`` unless another thread already did.
+
+    Refresh tokens are single use, so two concurrent refreshes would leave one
+    caller with an invalidated token. The lock serializes refreshes and the
+    stored token with the same client and scopes is checked again once it is
+    held: if its refresh token
+    differs from ``token``'s, that refresh already happened and its result is
+    returned instead. Public client tokens use :func:`refresh_token_public`.
+    """
+    identity = _token_identity(token)
+    with _refresh_lock:
+        current = next((t for t in _load_tokens() if _token_identity(t) == identity), None)
+        if current is not None and current.get("refresh_token") != token.get("refresh_token"):
+            return current
+        if token.get("public"):
+            return refresh_token_public(token)
+        return refresh_token(token)
+
 
+def _expires_in(token: dict) -> float | None:
     expires_at = token.get("expires_at")
-    if isinstance(expires_at, (int, float)) and expires_at <= time.time():
-        return refresh_token_public(token)
+    if isinstance(expires_at, (int, float)):
+        return expires_at - time.time()
+    return None
+
+
+def ensure_valid_token_public(account_name: str, scope: str = DEFAULT_SCOPE) -> dict:
+    """Return a valid token for a public client, refreshing it if necessary.
+
+    Raises :class:`NotLoggedIn` if no stored token grants ``scope``.
+    """
+    token = load_token(scope, client_id=account_name)
+    if token is None:
+        raise NotLoggedIn(f"Not logged in as {account_name}; log in from the Account view")
+
+    remaining = _expires_in(token)
+    if remaining is not None and remaining <= 0:
+        return _refresh_once(token)
 
     return token
 
@@ -348,18 +523,7 @@ def request_token_via_refresh(refresh_token: str) -> dict:
     }
     if client_secret:
         data["client_secret"] = client_secret
-    req = request.Request(
-        TOKEN_URL,
-        data=urlencode(data).encode(),
-        headers={
-            "User-Agent": "ExiledOverlay",
-            "Content-Type": "application/x-www-form-urlencoded",
-        },
-    )
-    with request.urlopen(req) as resp:
-        if resp.status != 200:
-            raise RuntimeError(f"Token request failed: {resp.status}")
-        token = json.load(resp)
+    token = _post_token(data, "Token request failed")
 
     if "access_token" not in token or "refresh_token" not in token:
         raise RuntimeError("Token response missing required fields")
@@ -370,13 +534,95 @@ def request_token_via_refresh(refresh_token: str) -> dict:
 
 
 def ensure_valid_token(scope: str = DEFAULT_SCOPE) -> dict:
-    """Return a valid OAuth token, refreshing or logging in if necessary."""
-    token = load_token()
+    """Return a valid OAuth token, refreshing it if necessary.
+
+    Any stored token granted ``scope`` is used, whichever client obtained it.
+    Views call this from background jobs, so it never starts a browser
+    login; without a token it raises :class:`NotLoggedIn` and the Account
+    view's login has to be used.
+    """
+    token = load_token(scope)
     if token is None:
-        return login(scope)
+        raise NotLoggedIn("Not logged in; log in from the Account view")
 
-    expires_at = token.get("expires_at")
-    if isinstance(expires_at, (int, float)) and expires_at <= time.time():
-        return refresh_token(token)
+    remaining = _expires_in(token)
+    if remaining is not None and remaining <= 0:
+        return _refresh_once(token)
 
     return token
+
+
+class TokenRefresher:
+    """Background thread renewing stored tokens before they expire.
+
+    Wakes up ``margin`` seconds before ``expires_at`` and refreshes through
+    :func:`_refresh_once`, so requests never wait for a token round trip and
+    never race a refresh started by :func:`ensure_valid_token`.
+    """
+
+    def __init__(self, margin: float = REFRESH_MARGIN):
+        self.margin = margin
+        self.refreshes = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _delay(self, token: dict) -> float:
+        remaining = _expires_in(token)
+        if remaining is None or not token.get("refresh_token"):
+            return REFRESH_POLL
+        return max(0.0, remaining - self.margin)
+
+    def next_delay(self) -> float:
+        """Return the seconds until the next stored token should be renewed."""
+        return min((self._delay(t) for t in _load_tokens()), default=REFRESH_POLL)
+
+    def run_once(self) -> float:
+        """Refresh every token that is due and return the next delay."""
+        failed = False
+        for token in _load_tokens():
+            if self._delay(token) > 0:
+                continue
+            try:
+                _refresh_once(token)
+            except Exception:
+                self.failures += 1
+                failed = True
+            else:
+                self.refreshes += 1
+        if failed:
+            return REFRESH_RETRY
+        return min(self.next_delay(), REFRESH_POLL)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._stop.wait(self.run_once())
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="token-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_refresher: TokenRefresher | None = None
+
+
+def start_token_refresher(margin: float = REFRESH_MARGIN) -> TokenRefresher:
+    """Start the shared background refresher if it is not running yet."""
+    global _refresher
+    if _refresher is None:
+        _refresher = TokenRefresher(margin)
+    _refresher.start()
+    return _refresher
+
+
+def stop_token_refresher() -> None:
+    if _refresher is not None:
+        _refresher.stop()
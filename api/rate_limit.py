@@ -0,0 +1,232 @@
+# api/rate_limit.py
+"""Client side throttling driven by the PoE API rate limit headers.
+
+Every response from the PoE API describes the policy that applies to the
+endpoint::
+
+    X-Rate-Limit-Policy: stash-request-limit
+    X-Rate-Limit-Rules: Account
+    X-Rate-Limit-Account: 30:60:60,100:1800:600
+    X-Rate-Limit-Account-State: 3:60:0,3:1800:0
+
+Each rule lists ``max_hits:period:restriction`` windows and its ``-State``
+header the hits the server has counted so far. The governor keeps a bucket
+per window whose tokens return exactly ``period`` seconds after they were
+spent, mirroring how the server counts, so requests are sent as fast as the
+limits allow without ever exceeding them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+# Extra seconds before a spent token is considered returned, covering clock
+# differences between us and the server.
+CLOCK_SKEW = 0.5
+# Poll interval while the first request to an endpoint discovers its policy.
+PROBE_WAIT = 0.05
+
+
+def endpoint_key(url: str) -> str:
+    """Return the key used to group ``url`` with requests of the same policy."""
+    parts = urlparse(url)
+    segment = parts.path.strip("/").split("/", 1)[0]
+    return f"{parts.netloc}/{segment}"
+
+
+def _parse_windows(value: str | None) -> list[tuple[int, int, int]]:
+    """Parse ``"30:60:60,100:1800:600"`` into integer triples."""
+    windows = []
+    for part in (value or "").split(","):
+        fields = part.strip().split(":")
+        if len(fields) != 3:
+            continue
+        try:
+            windows.append(tuple(int(f) for f in fields))
+        except ValueError:
+            continue
+    return windows
+
+
+class _Bucket:
+    """Token bucket for one ``max_hits`` per ``period`` window."""
+
+    def __init__(self, max_hits: int, period: int):
+        self.max_hits = max_hits
+        self.period = period
+        self.spent: deque[float] = deque()
+
+    def expire(self, now: float) -> None:
+        while self.spent and self.spent[0] + self.period + CLOCK_SKEW <= now:
+            self.spent.popleft()
+
+    def wait_time(self, now: float) -> float:
+        self.expire(now)
+        if len(self.spent) < self.max_hits:
+            return 0.0
+        return self.spent[0] + self.period + CLOCK_SKEW - now
+
+    def sync(self, hits: int, now: float) -> None:
+        """Account for hits the server counted that we did not send."""
+        self.expire(now)
+        while len(self.spent) < min(hits, self.max_hits):
+            self.spent.append(now)
+
+
+class _Policy:
+    def __init__(self) -> None:
+        self.buckets: dict[tuple[str, int], _Bucket] = {}
+        self.blocked_until = 0.0
+
+
+class RateLimitGovernor:
+    """Schedule requests so they stay within the advertised rate limits.
+
+    Call :meth:`acquire` before a request and :meth:`update` with the
+    response headers afterwards. Until the first response for an endpoint
+    reveals its policy only one request to it is allowed in flight.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._policies: dict[str, _Policy] = {}
+        self._endpoint_policy: dict[str, str] = {}
+        self._probing: set[str] = set()
+        self.requests = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+
+    def reserve(self, endpoint: str) -> float:
+        """Spend a token for ``endpoint`` or return the seconds to wait."""
+        with self._lock:
+            now = self._clock()
+            policy = self._policies.get(self._endpoint_policy.get(endpoint, endpoint))
+            if policy is None:
+                if endpoint in self._probing:
+                    return PROBE_WAIT
+                self._probing.add(endpoint)
+                self.requests += 1
+                return 0.0
+
+            wait = policy.blocked_until - now
+            for bucket in policy.buckets.values():
+                wait = max(wait, bucket.wait_time(now))
+            if wait > 0:
+                return wait
+            for bucket in policy.buckets.values():
+                bucket.spent.append(now)
+            self.requests += 1
+            return 0.0
+
+    def delay_hint(self, endpoint: str) -> float:
+        """Return how long a request to ``endpoint`` would wait right now.
+
+        Unlike :meth:`reserve` no token is spent.
+        """
+        with self._lock:
+            now = self._clock()
+            policy = self._policies.get(self._endpoint_policy.get(endpoint, endpoint))
+            if policy is None:
+                return 0.0
+            wait = policy.blocked_until - now
+            for bucket in policy.buckets.values():
+                wait = max(wait, bucket.wait_time(now))
+            return max(0.0, wait)
+
+    def acquire(self, endpoint: str) -> float:
+        """Block until a request to ``endpoint`` may be sent.
+
+        Returns the total number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            delay = self.reserve(endpoint)
+            if delay <= 0:
+                break
+            self._sleep(delay)
+            waited += delay
+        self._record_wait(waited)
+        return waited
+
+    async def acquire_async(self, endpoint: str) -> float:
+        """Like :meth:`acquire` but waits without blocking the event loop."""
+        waited = 0.0
+        while True:
+            delay = self.reserve(endpoint)
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        self._record_wait(waited)
+        return waited
+
+    def _record_wait(self, waited: float) -> None:
+        if waited:
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def update(self, endpoint: str, headers, status: int = 200) -> None:
+        """Record the rate limit state reported in a response."""
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        with self._lock:
+            self._probing.discard(endpoint)
+            now = self._clock()
+            name = headers.get("x-rate-limit-policy") or self._endpoint_policy.get(
+                endpoint, endpoint
+            )
+            self._endpoint_policy[endpoint] = name
+            policy = self._policies.setdefault(name, _Policy())
+
+            rules = headers.get("x-rate-limit-rules", "")
+            for rule in (r.strip() for r in rules.split(",")):
+                if not rule:
+                    continue
+                limits = _parse_windows(headers.get(f"x-rate-limit-{rule.lower()}"))
+                state = _parse_windows(headers.get(f"x-rate-limit-{rule.lower()}-state"))
+                hits_by_period = {period: (hits, active) for hits, period, active in state}
+                for max_hits, period, _restriction in limits:
+                    key = (rule, period)
+                    bucket = policy.buckets.get(key)
+                    if bucket is None or bucket.max_hits != max_hits:
+                        bucket = policy.buckets[key] = _Bucket(max_hits, period)
+                    hits, active = hits_by_period.get(period, (0, 0))
+                    bucket.sync(hits, now)
+                    if active > 0:
+                        policy.blocked_until = max(policy.blocked_until, now + active)
+
+            if status == 429:
+                self.throttled += 1
+            retry_after = headers.get("retry-after")
+            if retry_after:
+                try:
+                    policy.blocked_until = max(
+                        policy.blocked_until, now + float(retry_after)
+                    )
+                except ValueError:
+                    pass
+
+    def release(self, endpoint: str) -> None:
+        """Allow another probe after a request failed without a response."""
+        with self._lock:
+            self._probing.discard(endpoint)
+
+    def metrics(self) -> dict:
+        """Return counters describing how much time was spent throttled."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "max_wait": self.max_wait,
+                "throttled": self.throttled,
+            }
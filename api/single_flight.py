@@ -0,0 +1,113 @@
+# api/single_flight.py
+"""Coalesce identical requests that are in flight at the same time.
+
+When the Currency refresh and a Tracker update ask for the same URL with the
+same token at once, only the first caller sends the request; the others wait
+for it and receive the same decoded result (or exception). Results are not
+cached beyond the lifetime of the request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Thread based request coalescing keyed by any hashable value."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[object, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return ``fn(*args, **kwargs)``, sharing a concurrent call for ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+class _AsyncCall:
+    def __init__(self, task: asyncio.Future) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Request coalescing for coroutines running on one event loop.
+
+    The shared call runs as its own task, so a caller that is cancelled
+    stops waiting without cancelling the request for the others. The task
+    is only cancelled once every caller has given up on it.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[object, _AsyncCall] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        """Await ``coro_fn(*args, **kwargs)``, sharing a concurrent call for ``key``."""
+        call = self._calls.get(key)
+        if call is not None and not call.task.done():
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            call = self._calls[key] = _AsyncCall(
+                asyncio.ensure_future(coro_fn(*args, **kwargs))
+            )
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+
+    def _finished(self, key, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Retrieve it so an error nobody waited for isn't logged.
+            call.task.exception()
+
+    def metrics(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced}
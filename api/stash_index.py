@@ -0,0 +1,91 @@
+# api/stash_index.py
+"""Inverted index of stash contents by item name.
+
+Items are indexed under their normalized ``typeLine`` and ``name`` so a
+count query is a single dictionary lookup instead of a scan over every item
+in every tab. Each tab is indexed separately while it is downloaded and then
+swapped into the shared :class:`StashIndex`, which keeps running totals so
+replacing or removing a tab only touches the names that tab contains.
+"""
+
+from __future__ import annotations
+
+
+def normalize(name: str) -> str:
+    """Return the lookup key for an item name."""
+    return " ".join(name.split()).casefold()
+
+
+class TabIndex:
+    """Stack totals and locations of the items in a single tab."""
+
+    def __init__(self) -> None:
+        self.totals: dict[str, int] = {}
+        self.locations: dict[str, list[tuple[int | None, int | None, int]]] = {}
+
+    def add_item(self, item: dict) -> None:
+        stack = int(item.get("stackSize", 1))
+        keys = {normalize(n) for n in (item.get("typeLine"), item.get("name")) if n}
+        for key in keys:
+            self.totals[key] = self.totals.get(key, 0) + stack
+            self.locations.setdefault(key, []).append((item.get("x"), item.get("y"), stack))
+
+
+class StashIndex:
+    """Name to per-tab stack totals across every tab of a stash."""
+
+    def __init__(self) -> None:
+        self._tabs: dict[str, TabIndex] = {}
+        self._totals: dict[str, int] = {}
+        self._by_tab: dict[str, dict[str, int]] = {}
+
+    def _subtract(self, tab_id: str, tab: TabIndex) -> None:
+        for key, stack in tab.totals.items():
+            # A key whose tabs all hold zero stacks has no total entry.
+            remaining = self._totals.get(key, 0) - stack
+            if remaining:
+                self._totals[key] = remaining
+            else:
+                self._totals.pop(key, None)
+            per_tab = self._by_tab[key]
+            del per_tab[tab_id]
+            if not per_tab:
+                del self._by_tab[key]
+
+    def replace_tab(self, tab_id: str, tab: TabIndex) -> None:
+        """Swap in the freshly indexed contents of ``tab_id``."""
+        old = self._tabs.get(tab_id)
+        if old is not None:
+            self._subtract(tab_id, old)
+        self._tabs[tab_id] = tab
+        for key, stack in tab.totals.items():
+            self._totals[key] = self._totals.get(key, 0) + stack
+            self._by_tab.setdefault(key, {})[tab_id] = stack
+
+    def remove_tab(self, tab_id: str) -> None:
+        old = self._tabs.pop(tab_id, None)
+        if old is not None:
+            self._subtract(tab_id, old)
+
+    def tab_ids(self) -> list[str]:
+        return list(self._tabs)
+
+    def count(self, name: str) -> int:
+        """Return the total stack size of items called ``name``."""
+        return self._totals.get(normalize(name), 0)
+
+    def counts(self, names) -> dict[str, int]:
+        return {name: self.count(name) for name in names}
+
+    def tab_totals(self, name: str) -> dict[str, int]:
+        """Return the stack total of ``name`` in each tab that holds it."""
+        return dict(self._by_tab.get(normalize(name), {}))
+
+    def locations(self, name: str) -> list[dict]:
+        """Return every stack of ``name`` with its tab and grid position."""
+        key = normalize(name)
+        found = []
+        for tab_id in self._by_tab.get(key, {}):
+            for x, y, stack in self._tabs[tab_id].locations[key]:
+                found.append({"tab": tab_id, "x": x, "y": y, "stack": stack})
+        return found
@@ -0,0 +1,80 @@
+"""Compare per-request latency of ``urlopen`` and the pooled HTTP client.
+
+Starts a local keep-alive stub server that answers like a stash tab and
+sends the same number of requests through both code paths::
+
+    python benchmarks/bench_http_client.py [requests]
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api.http_client import HTTPClient
+
+PAYLOAD = json.dumps(
+    {"items": [{"typeLine": "Chaos Orb", "stackSize": 10}] * 200}
+).encode()
+PAYLOAD_GZIP = gzip.compress(PAYLOAD)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = PAYLOAD
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = PAYLOAD_GZIP
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _bench(label, fetch, count):
+    start = time.perf_counter()
+    for i in range(count):
+        fetch(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {count} requests  {elapsed * 1000 / count:7.3f} ms/request")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    httpd = ThreadingHTTPServer(("localhost", 0), _StubHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://localhost:{httpd.server_address[1]}"
+
+    def with_urlopen(i):
+        with request.urlopen(f"{base}/stash/{i}") as resp:
+            json.load(resp)
+
+    client = HTTPClient()
+
+    def with_pool(i):
+        client.get(f"{base}/stash/{i}").json()
+
+    _bench("urlopen", with_urlopen, count)
+    _bench("HTTPClient", with_pool, count)
+    print(f"HTTPClient opened {client.connections_opened} connection(s)")
+
+    client.close()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Time from launching the overlay to its first paint.
+
+Each run starts a fresh interpreter that imports ``main`` (and with it
+PyQt6 and the overlay), builds the window like ``main.main`` does and stops
+at the first paint event. ``--eager`` additionally constructs every view up
+front, as the overlay did before views were built on first use::
+
+    python benchmarks/bench_startup.py [runs] [--eager]
+
+Requires PyQt6. Uses the ``offscreen`` Qt platform unless ``QT_QPA_PLATFORM``
+is already set. ``HOME`` points at an empty temporary directory so the runs
+neither read nor write your tokens and saved data.
+"""
+
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process; prints seconds from start to the first paint.
+CHILD = """
+import time
+start = time.perf_counter()
+import sys
+sys.path.insert(0, {root!r})
+import main
+from PyQt6.QtCore import QEvent, QObject, QTimer
+
+app = main.create_app(sys.argv[:1])
+window = main.OverlayWindow()
+if {eager!r}:
+    for name in window.modules.names():
+        window.modules.get(name)
+
+
+class FirstPaint(QObject):
+    elapsed = None
+
+    def eventFilter(self, obj, event):
+        if self.elapsed is None and event.type() == QEvent.Type.Paint:
+            self.elapsed = time.perf_counter() - start
+            QTimer.singleShot(0, app.quit)
+        return False
+
+
+first_paint = FirstPaint()
+app.installEventFilter(first_paint)
+window.show()
+QTimer.singleShot(30000, app.quit)
+app.exec()
+print(first_paint.elapsed)
+"""
+
+
+def main():
+    if importlib.util.find_spec("PyQt6") is None:
+        print("skipped: PyQt6 is not installed")
+        return
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    runs = int(args[0]) if args else 5
+    eager = "--eager" in sys.argv
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    script = CHILD.format(root=ROOT, eager=eager)
+    times = []
+    with tempfile.TemporaryDirectory() as home:
+        env["HOME"] = home
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", script],
+                check=True,
+                capture_output=True,
+                text=True,
+                cwd=home,
+                env=env,
+            ).stdout.split()
+            if not out or out[-1] == "None":
+                raise SystemExit("the window was never painted")
+            times.append(float(out[-1]))
+
+    mode = "eager" if eager else "lazy"
+    print(
+        f"{mode} startup to first paint over {runs} runs: "
+        f"median {statistics.median(times) * 1000:.1f} ms, "
+        f"min {min(times) * 1000:.1f} ms, max {max(times) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
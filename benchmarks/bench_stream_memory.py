@@ -0,0 +1,96 @@
+"""Peak memory of decoding a large stash tab whole versus streaming it.
+
+Writes a synthetic 5,000 item tab to a temporary file and aggregates it in
+a fresh interpreter per mode, reporting each process's peak RSS::
+
+    python benchmarks/bench_stream_memory.py [items]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process: aggregate the tab at argv[2] using mode argv[1].
+CHILD = """
+import json, resource, sys
+sys.path.insert(0, {root!r})
+from api.json_stream import iter_array
+from api.stash_index import TabIndex
+
+mode, path = sys.argv[1], sys.argv[2]
+index = TabIndex()
+if mode == "json.load":
+    with open(path, "rb") as f:
+        data = json.load(f)
+    for item in data.get("items", []):
+        index.add_item(item)
+elif mode == "streaming":
+    with open(path, "rb") as f:
+        for item in iter_array(f):
+            index.add_item(item)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    peak //= 1024
+print(peak, sum(index.totals.values()))
+"""
+
+
+def _synthetic_item(i):
+    return {
+        "id": f"{i:064x}",
+        "verified": False,
+        "w": 2,
+        "h": 3,
+        "icon": f"https://web.poecdn.com/image/Art/2DItems/Armours/Item{i}.png",
+        "league": "Standard",
+        "name": f"Doom Shell {i}",
+        "typeLine": "Astral Plate",
+        "identified": True,
+        "ilvl": 84,
+        "frameType": 2,
+        "properties": [
+            {"name": "Armour", "values": [["1234", 1]], "displayMode": 0, "type": 16},
+            {"name": "Quality", "values": [["+20%", 1]], "displayMode": 0, "type": 6},
+        ],
+        "requirements": [{"name": "Level", "values": [["62", 0]], "displayMode": 0}],
+        "implicitMods": ["+12% to all Elemental Resistances"],
+        "explicitMods": [
+            "+112 to maximum Life",
+            "+45% to Fire Resistance",
+            "+38% to Cold Resistance",
+            "84% increased Armour",
+            "+30 to Strength",
+        ],
+        "x": i % 24,
+        "y": (i // 24) % 24,
+        "inventoryId": "Stash1",
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tab.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"items": [_synthetic_item(i) for i in range(count)]}, f)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"synthetic tab: {count} items, {size_mb:.1f} MB of JSON")
+
+        script = CHILD.format(root=ROOT)
+        for mode in ("baseline", "json.load", "streaming"):
+            out = subprocess.run(
+                [sys.executable, "-c", script, mode, path],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.split()
+            peak_kb, items = int(out[0]), int(out[1])
+            print(f"{mode:<10} peak RSS {peak_kb / 1024:7.1f} MB  (stack total {items})")
+
+
+if __name__ == "__main__":
+    main()
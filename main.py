@@ -1,13 +1,76 @@
 import sys
+from ui.modules import startup_profiler
+
+# Must run before the imports below so their cost shows up in the profile.
+startup_profiler.enable_from(sys.argv)
+
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QEvent, QObject, QTimer
 from ui.overlay_window import OverlayWindow
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
+# Shutdown hooks of the services the views start on first use. A module is
+# only looked up if something already imported it, so the overlay never
+# loads the job runner, the API stack or the icon loader just to be able
+# to shut them down.
+SHUTDOWN_HOOKS = (
+    ("ui.job_runner", "shutdown_job_runner"),
+    ("ui.icon_loader", "shutdown_icon_loader"),
+    # Flush debounced saves before the process exits.
+    ("ui.modules.write_behind", "close_write_behind"),
+    ("api.poe_auth", "stop_token_refresher"),
+    ("api.poe_api", "flush_response_cache"),
+)
+
+
+class _FirstPaint(QObject):
+    """Finishes the startup profile once anything has been painted.
+
+    Also quits right away for ``--exit-after-startup``, with or without
+    profiling.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            self.app.removeEventFilter(self)
+            path = startup_profiler.finish("first_paint")
+            if path:
+                print(f"Startup profile written to {path}", file=sys.stderr)
+            if startup_profiler.exit_after_startup:
+                QTimer.singleShot(0, self.app.quit)
+        return False
+
+
+def shutdown():
+    for module_name, hook in SHUTDOWN_HOOKS:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            getattr(module, hook)()
+
+
+def create_app(argv):
+    app = QApplication(argv)
     app.setAttribute(Qt.ApplicationAttribute.AA_Use96Dpi)
+    app.aboutToQuit.connect(shutdown)
+    return app
+
+
+def main(argv=None):
+    with startup_profiler.span("startup", "QApplication"):
+        app = create_app(sys.argv if argv is None else argv)
+    if startup_profiler.active() or startup_profiler.exit_after_startup:
+        app.installEventFilter(_FirstPaint(app))
     
-    window = OverlayWindow()
-    window.show()
+    with startup_profiler.span("startup", "OverlayWindow"):
+        window = OverlayWindow()
+    with startup_profiler.span("startup", "show"):
+        window.show()
     
-    sys.exit(app.exec())
\ No newline at end of file
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
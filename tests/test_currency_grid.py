@@ -0,0 +1,22 @@
+import os
+import sys
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from ui.modules.currency import diff_rows
+
+
+def test_identical_rows_need_no_update():
+    shown = {"Chaos Orb": ("12", "+3.0/h"), "Divine Orb": ("1", "")}
+    assert diff_rows(shown, dict(shown)) == ([], [], [])
+
+
+def test_only_changed_and_new_rows_are_reported():
+    shown = {"Chaos Orb": ("12", ""), "Divine Orb": ("1", ""), "Ancient Orb": ("4", "")}
+    wanted = {"Chaos Orb": ("15", "+3.0/h"), "Divine Orb": ("1", ""), "Orb of Fusing": ("7", "")}
+    added, removed, changed = diff_rows(shown, wanted)
+    assert added == ["Orb of Fusing"]
+    assert removed == ["Ancient Orb"]
+    assert changed == ["Chaos Orb"]
@@ -0,0 +1,87 @@
+import os
+import sys
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from ui.modules import currency
+from ui.modules.currency import CurrencyHistory, HistoryStore, _Ring
+
+
+def test_ring_keeps_newest_samples_in_order():
+    ring = _Ring(4)
+    for t in range(10):
+        ring.append(float(t), t * 10)
+    assert len(ring) == 4
+    times, counts = ring.slice(0, len(ring))
+    assert list(times) == [6.0, 7.0, 8.0, 9.0]
+    assert list(counts) == [60, 70, 80, 90]
+    assert ring.last() == (9.0, 90)
+
+
+def test_history_downsamples_and_drops_repeats():
+    history = CurrencyHistory()
+    assert history.record(0, 1)
+    assert not history.record(10, 1)  # unchanged
+    for t in range(1, 180):
+        history.record(t * 20, t + 1)
+    raw, minute, hour = history.tiers
+    assert len(raw) == 180
+    assert len(minute) == 60  # three samples per minute collapse into one
+    assert len(hour) == 1
+    assert minute.last() == (179 * 20, 180)
+
+
+def test_queries_fall_back_to_coarser_tiers(monkeypatch):
+    monkeypatch.setattr(currency, "TIERS", ((0, 10), (60, 100), (3600, 100)))
+    history = CurrencyHistory()
+    for t in range(0, 6000, 10):
+        history.record(t, t // 10)
+    # Raw only covers the last 100 seconds; older lookups use the minutes.
+    assert history.value_at(5995) == 599
+    assert history.value_at(1205) == 119  # last sample of that minute
+    times, counts = history.series(3000, 3300)
+    assert list(times) == [3050, 3110, 3170, 3230, 3290]
+    assert history.value_at(-1) is None
+
+
+def test_rate_per_hour():
+    history = CurrencyHistory()
+    history.record(0, 100)
+    history.record(1800, 150)
+    assert history.rate(0, 3600) == 50
+    # History starting inside the window is measured from its first sample.
+    assert history.rate(-3600, 1800) == 100
+    assert CurrencyHistory().rate(0, 3600) is None
+
+
+def test_store_persists_through_log_and_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(currency, "COMPACT_AFTER", 5)
+    store = HistoryStore(str(tmp_path))
+    for t in range(12):
+        store.record({"Chaos Orb": t, "Divine Orb": 1}, timestamp=1000 + t * 60)
+
+    # A crash in the middle of an append leaves a partial record.
+    with open(store._path("Chaos Orb", ".log"), "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    reloaded = HistoryStore(str(tmp_path))
+    chaos = reloaded.history("Chaos Orb")
+    assert len(chaos.tiers[0]) == 12
+    assert chaos.value_at(1000 + 11 * 60) == 11
+    assert len(reloaded.history("Divine Orb").tiers[0]) == 1
+
+    reloaded.record({"Chaos Orb": 12}, timestamp=2000)
+    again = HistoryStore(str(tmp_path))
+    assert again.history("Chaos Orb").value_at(2000) == 12
+
+
+def test_store_loads_histories_ahead_of_use(tmp_path):
+    HistoryStore(str(tmp_path)).record({"Chaos Orb": 5}, timestamp=100.0)
+
+    store = HistoryStore(str(tmp_path), clock=lambda: 200.0)
+    assert not store.loaded("Chaos Orb")
+    store.load(["Chaos Orb", "Divine Orb"])
+    assert store.loaded("Chaos Orb") and store.loaded("Divine Orb")
+    assert store.rate("Divine Orb") is None
@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api.http_cache import ResponseCache, cache_key
+
+
+def _store(cache, url, body, etag='"v1"'):
+    key = cache_key(url, "account:stashes")
+    cache.store(key, {"ETag": etag}, json.dumps(body).encode(), body)
+    return key
+
+
+def test_cache_key_depends_on_scope():
+    assert cache_key("u", "account:stashes") != cache_key("u", "account:profile")
+
+
+def test_validators_and_load_survive_restart(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    key = _store(cache, "https://x/stash/a", {"items": [1]})
+    assert cache.conditional_headers(key) == {"If-None-Match": '"v1"'}
+    # The index is only written when flushed, once per sweep.
+    assert not os.path.exists(os.path.join(str(tmp_path), "index.json"))
+    cache.flush()
+
+    reopened = ResponseCache(str(tmp_path))
+    assert reopened.conditional_headers(key) == {"If-None-Match": '"v1"'}
+    assert reopened.load(key) == {"items": [1]}
+    assert reopened.metrics()["hits"] == 1
+
+
+def test_responses_without_validators_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    key = cache_key("https://x/stash/a")
+    cache.store(key, {}, b"{}", {})
+    assert cache.conditional_headers(key) == {}
+    assert cache.load(key) is None
+    assert cache.metrics()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    body = {"items": ["x" * 40]}
+    size = len(json.dumps(body).encode())
+    cache = ResponseCache(str(tmp_path), max_bytes=size * 2)
+    first = _store(cache, "https://x/stash/a", body)
+    second = _store(cache, "https://x/stash/b", body)
+    cache.load(first)
+    third = _store(cache, "https://x/stash/c", body)
+
+    assert cache.conditional_headers(second) == {}
+    assert cache.load(first) == body
+    assert cache.load(third) == body
+    assert cache.metrics()["evictions"] == 1
+    assert not os.path.exists(os.path.join(str(tmp_path), f"{second}.json"))
@@ -0,0 +1,73 @@
+import gzip
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api.http_client import HTTPClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("localhost", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield f"http://localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused(server):
+    client = HTTPClient()
+    for i in range(3):
+        resp = client.get(f"{server}/stash/{i}")
+        assert resp.status == 200
+        assert resp.json() == {"path": f"/stash/{i}"}
+    assert client.connections_opened == 1
+    client.close()
+
+
+def test_gzip_responses_are_decoded(server):
+    client = HTTPClient()
+    resp = client.get(f"{server}/x")
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.json() == {"path": "/x"}
+    client.close()
+
+
+def test_post_sends_body(server):
+    client = HTTPClient()
+    resp = client.post(f"{server}/token", b"grant_type=refresh_token")
+    assert resp.body == b"grant_type=refresh_token"
+    client.close()
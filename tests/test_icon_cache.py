@@ -0,0 +1,66 @@
+import os
+import sys
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from api.http_client import Response
+from ui.modules.icon_cache import IconDiskCache, LRUCache, fetch_icon
+
+URL = "https://web.poecdn.com/image/Art/2DItems/Currency/CurrencyRerollRare.png"
+
+
+class FakeClient:
+    def __init__(self, status=200, body=b"png"):
+        self.status = status
+        self.body = body
+        self.requests = []
+
+    def get(self, url):
+        self.requests.append(url)
+        return Response(self.status, {}, self.body)
+
+
+def test_lru_evicts_least_recently_used_by_cost():
+    cache = LRUCache(max_cost=10)
+    cache.put("a", "A", 4)
+    cache.put("b", "B", 4)
+    assert cache.get("a") == "A"
+    cache.put("c", "C", 4)
+    assert "b" not in cache
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.cost == 8
+    cache.put("huge", "H", 11)
+    assert "huge" not in cache and len(cache) == 2
+
+
+def test_icons_are_fetched_once_then_read_from_disk(tmp_path):
+    disk = IconDiskCache(str(tmp_path))
+    client = FakeClient()
+    assert fetch_icon(URL, disk, client) == b"png"
+    assert fetch_icon(URL, disk, client) == b"png"
+    assert client.requests == [URL]
+    # A fresh cache over the same directory needs no network either.
+    assert fetch_icon(URL, IconDiskCache(str(tmp_path)), FakeClient(status=500)) == b"png"
+
+
+def test_failed_requests_are_not_cached(tmp_path):
+    disk = IconDiskCache(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        fetch_icon(URL, disk, FakeClient(status=404))
+    assert disk.get(URL) is None
+
+
+def test_disk_cache_trims_least_recently_used(tmp_path):
+    disk = IconDiskCache(str(tmp_path), max_bytes=300)
+    for i in range(3):
+        disk.put(f"{URL}?{i}", b"x" * 100)
+        os.utime(disk.path_for(f"{URL}?{i}"), (i, i))
+    disk.get(f"{URL}?0")  # now the most recently used
+    disk.put(f"{URL}?3", b"x" * 100)
+    assert disk.get(f"{URL}?0") is not None
+    assert disk.get(f"{URL}?1") is None
+    assert disk.get(f"{URL}?3") is not None
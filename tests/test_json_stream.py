@@ -0,0 +1,39 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api.json_stream import iter_array
+
+
+DOC = {
+    "stash": {"id": "a", "name": "Dump \"1\" ]}"},
+    "items": [
+        {"typeLine": "Chaos Orb", "stackSize": 12345},
+        {"typeLine": "Orb of Fusing", "note": "~price 1 chaos ]"},
+        12345678,
+        "ünïcödé",
+    ],
+    "after": [1, 2, 3],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64 * 1024])
+def test_iter_array_matches_json_load(chunk_size):
+    fp = io.BytesIO(json.dumps(DOC, indent=1, ensure_ascii=False).encode())
+    assert list(iter_array(fp, chunk_size=chunk_size)) == DOC["items"]
+
+
+def test_iter_array_missing_or_empty():
+    assert list(iter_array(io.BytesIO(b'{"tabs": []}'))) == []
+    assert list(iter_array(io.BytesIO(b'{ "items" : [ ] }'))) == []
+    assert list(iter_array(io.BytesIO(b"{}"))) == []
+
+
+def test_iter_array_truncated_input():
+    with pytest.raises(ValueError):
+        list(iter_array(io.BytesIO(b'{"items": [{"a": 1}, {"b"'), chunk_size=4))
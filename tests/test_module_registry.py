@@ -0,0 +1,37 @@
+import os
+import sys
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from ui.modules.module_registry import ModuleRegistry
+
+
+def test_views_are_built_once_on_first_use():
+    built = []
+
+    def factory(name):
+        def build():
+            built.append(name)
+            return object()
+        return build
+
+    registry = ModuleRegistry([("A", factory("A")), ("B", factory("B"))])
+    assert registry.names() == ["A", "B"]
+    assert built == []
+    assert not registry.is_built("B")
+
+    view = registry.get("B")
+    assert registry.get("B") is view
+    assert built == ["B"]
+    assert list(registry.built()) == ["B"]
+
+
+def test_string_factories_import_lazily():
+    registry = ModuleRegistry([("Guide", "ui.modules.levelguide:LevelGuide")])
+    sys.modules.pop("ui.modules.levelguide", None)
+    assert "ui.modules.levelguide" not in sys.modules
+    guide = registry.get("Guide")
+    assert "ui.modules.levelguide" in sys.modules
+    assert guide.get_acts()
@@ -0,0 +1,252 @@
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api import poe_api
+from api.http_cache import ResponseCache
+from api.rate_limit import RateLimitGovernor
+
+
+TABS = {
+    "tabs": [{"id": "a"}, {"id": "b"}],
+}
+TAB_ITEMS = {
+    "a": {"items": [
+        {"typeLine": "Chaos Orb", "stackSize": 10},
+        {"typeLine": "Divine Orb", "stackSize": 2},
+    ]},
+    "b": {"items": [
+        {"typeLine": "Chaos Orb", "stackSize": 5},
+        {"typeLine": "Leather Belt", "name": "Headhunter"},
+    ]},
+}
+
+
+def _patch_api(monkeypatch, fake_request):
+    """Serve both the decoded and the streaming request helpers from ``fake_request``."""
+
+    def api_request(url, token=None, scope="", if_modified=False):
+        return fake_request(url, token, scope)
+
+    def fake_iter_items(url, token=None, scope="", if_modified=False):
+        yield from fake_request(url, token, scope).get("items", [])
+
+    monkeypatch.setattr(poe_api, "_api_request", api_request)
+    monkeypatch.setattr(poe_api, "_iter_api_items", fake_iter_items)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    calls = []
+
+    def fake_request(url, token=None, scope=""):
+        calls.append(url)
+        if "/profile/stash-tabs" in url:
+            return TABS
+        tab_id = url.split("/stash/")[1].split("?")[0]
+        return TAB_ITEMS[tab_id]
+
+    _patch_api(monkeypatch, fake_request)
+    monkeypatch.setattr(poe_api, "_snapshots", {})
+    return calls
+
+
+def test_fetch_currency_counts(fake_api):
+    counts = poe_api.fetch_currency("tok", "Standard", ["Chaos Orb", "Exalted Orb"])
+    assert counts == {"Chaos Orb": 15, "Exalted Orb": 0}
+
+
+def test_fetch_item_count_matches_name(fake_api):
+    assert poe_api.fetch_item_count("tok", "Standard", "Headhunter") == 1
+    assert poe_api.fetch_item_count("tok", "Standard", "Divine Orb") == 2
+
+
+def test_queries_share_one_sweep(fake_api):
+    poe_api.fetch_currency("tok", "Standard", ["Chaos Orb"])
+    poe_api.fetch_item_count("tok", "Standard", "Headhunter")
+    poe_api.fetch_item_count("tok", "Standard", "Divine Orb")
+    assert len(fake_api) == 3
+
+
+def test_snapshot_refreshes_after_ttl(fake_api):
+    snapshot = poe_api.get_stash_snapshot("tok", "Standard", ttl=0)
+    assert snapshot.fetched_at is not None
+    poe_api.get_stash_snapshot("tok", "Standard", ttl=0)
+    listings = [url for url in fake_api if "/profile/stash-tabs" in url]
+    assert len(listings) == 2
+
+
+def test_parallel_sweep_matches_sequential(fake_api):
+    parallel = poe_api.StashSnapshot("tok", "Standard", workers=4, streaming=False)
+    parallel.refresh()
+    sequential = poe_api.StashSnapshot("tok", "Standard", workers=1, streaming=False)
+    sequential.refresh()
+    assert list(parallel.items) == ["a", "b"]
+    assert parallel.items == sequential.items
+    assert parallel.index.counts(["Chaos Orb", "Headhunter"]) == {"Chaos Orb": 15, "Headhunter": 1}
+    assert parallel.index.counts(["Chaos Orb"]) == sequential.index.counts(["Chaos Orb"])
+
+
+def test_streaming_snapshot_keeps_only_totals(fake_api):
+    snapshot = poe_api.StashSnapshot("tok", "Standard", streaming=True)
+    snapshot.refresh()
+    assert list(snapshot.iter_items()) == []
+    assert snapshot.index.tab_totals("Chaos Orb") == {"a": 10, "b": 5}
+    assert snapshot.item_locations("headhunter") == [{"tab": "b", "x": None, "y": None, "stack": 1}]
+
+
+def test_failed_tab_is_reported_and_rest_kept(monkeypatch):
+    def fake_request(url, token=None, scope=""):
+        if "/profile/stash-tabs" in url:
+            return TABS
+        if "/stash/a" in url:
+            raise RuntimeError("Failed request: 500")
+        return TAB_ITEMS["b"]
+
+    _patch_api(monkeypatch, fake_request)
+    snapshot = poe_api.StashSnapshot("tok", "Standard", workers=2)
+    snapshot.refresh()
+    assert snapshot.errors == {"a": "Failed request: 500"}
+    assert snapshot.index.tab_totals("Chaos Orb") == {"b": 5}
+    assert snapshot.currency_counts(["Chaos Orb"]) == {"Chaos Orb": 5}
+
+
+class _FakeResponse:
+    def __init__(self, status, headers=None, body=b""):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class _FakeStream:
+    def __init__(self, status, headers, fp):
+        self.status = status
+        self.headers = headers
+        self.fp = fp
+
+
+def test_unchanged_response_served_from_cache(monkeypatch, tmp_path):
+    sent = []
+    replies = [
+        _FakeResponse(200, {"ETag": '"v1"'}, b'{"items": [{"typeLine": "Chaos Orb"}]}'),
+        _FakeResponse(304, {"ETag": '"v1"'}),
+    ]
+
+    class FakeClient:
+        def get(self, url, headers=None):
+            sent.append(headers)
+            return replies.pop(0)
+
+    monkeypatch.setattr(poe_api, "default_client", FakeClient())
+    monkeypatch.setattr(poe_api, "rate_limiter", RateLimitGovernor())
+    monkeypatch.setattr(poe_api, "response_cache", ResponseCache(str(tmp_path)))
+
+    url = "https://api.pathofexile.com/stash/a"
+    first = poe_api._api_request(url, "tok", "account:stashes")
+    second = poe_api._api_request(url, "tok", "account:stashes")
+    assert first == second == {"items": [{"typeLine": "Chaos Orb"}]}
+    assert "If-None-Match" not in sent[0]
+    assert sent[1]["If-None-Match"] == '"v1"'
+    assert poe_api.response_cache.metrics()["hits"] == 1
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_refresh_revalidates_every_tab(monkeypatch, tmp_path, streaming):
+    listing = {"tabs": [{"id": "a", "name": "Dump"}, {"id": "b", "name": "Currency"}]}
+    contents = {"a": [{"typeLine": "Chaos Orb", "stackSize": 1}], "b": []}
+    downloaded = []
+
+    def reply(url, headers):
+        if "/profile/stash-tabs" in url:
+            body = json.dumps(listing).encode()
+        else:
+            tab_id = url.split("/stash/")[1].split("?")[0]
+            body = json.dumps({"items": contents[tab_id]}).encode()
+        etag = '"%d"' % hash(body)
+        if (headers or {}).get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        if "/stash/" in url:
+            downloaded.append(tab_id)
+        return 200, {"ETag": etag}, body
+
+    class FakeClient:
+        def get(self, url, headers=None):
+            return _FakeResponse(*reply(url, headers))
+
+        @contextlib.contextmanager
+        def stream(self, url, headers=None):
+            status, reply_headers, body = reply(url, headers)
+            yield _FakeStream(status, reply_headers, io.BytesIO(body))
+
+    monkeypatch.setattr(poe_api, "default_client", FakeClient())
+    monkeypatch.setattr(poe_api, "rate_limiter", RateLimitGovernor())
+    monkeypatch.setattr(poe_api, "response_cache", ResponseCache(str(tmp_path)))
+    snapshot = poe_api.StashSnapshot("tok", "Standard", workers=1, streaming=streaming)
+    snapshot.refresh()
+    assert downloaded == ["a", "b"]
+
+    snapshot.refresh()
+    assert snapshot.last_fetched == []
+
+    # The listing stays the same while a tab's contents change.
+    contents["a"] = [{"typeLine": "Chaos Orb", "stackSize": 250}]
+    snapshot.refresh()
+    assert snapshot.last_fetched == ["a"]
+    assert snapshot.currency_counts(["Chaos Orb"]) == {"Chaos Orb": 250}
+
+    listing["tabs"].append({"id": "c", "name": "New"})
+    contents["c"] = [{"typeLine": "Chaos Orb", "stackSize": 4}]
+    snapshot.refresh()
+    assert snapshot.last_fetched == ["c"]
+    assert snapshot.currency_counts(["Chaos Orb"]) == {"Chaos Orb": 254}
+
+    listing["tabs"] = listing["tabs"][1:]
+    snapshot.refresh()
+    assert list(snapshot.index.tab_ids()) == ["b", "c"]
+    assert snapshot.currency_counts(["Chaos Orb"]) == {"Chaos Orb": 4}
+
+    # A full refresh reads every tab again, from the cache if unchanged.
+    snapshot.refresh(full=True)
+    assert snapshot.last_fetched == ["b", "c"]
+    assert downloaded == ["a", "b", "a", "c"]
+
+
+def test_streamed_items_are_cached_and_revalidated(monkeypatch, tmp_path):
+    body = b'{"items": [{"typeLine": "Chaos Orb"}, {"typeLine": "Divine Orb"}]}'
+    replies = [(200, {"ETag": '"v1"'}, body), (304, {"ETag": '"v1"'}, b"")]
+    sent = []
+
+    class FakeClient:
+        @contextlib.contextmanager
+        def stream(self, url, headers=None):
+            sent.append(headers)
+            status, reply_headers, reply_body = replies.pop(0)
+            yield _FakeStream(status, reply_headers, io.BytesIO(reply_body))
+
+    monkeypatch.setattr(poe_api, "default_client", FakeClient())
+    monkeypatch.setattr(poe_api, "rate_limiter", RateLimitGovernor())
+    monkeypatch.setattr(poe_api, "response_cache", ResponseCache(str(tmp_path)))
+
+    url = "https://api.pathofexile.com/stash/a"
+    first = list(poe_api._iter_api_items(url, "tok", "account:stashes"))
+    second = list(poe_api._iter_api_items(url, "tok", "account:stashes"))
+    assert first == second == [{"typeLine": "Chaos Orb"}, {"typeLine": "Divine Orb"}]
+    assert sent[1]["If-None-Match"] == '"v1"'
+    assert poe_api.response_cache.metrics()["hits"] == 1
+
+
+def test_fetch_item_counts_uses_one_sweep(fake_api):
+    counts = poe_api.fetch_item_counts(
+        "tok", "Standard", ["Chaos Orb", "headhunter", "Mirror of Kalandra"]
+    )
+    assert counts == {"Chaos Orb": 15, "headhunter": 1, "Mirror of Kalandra": 0}
+    assert len(fake_api) == 3
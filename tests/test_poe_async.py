@@ -0,0 +1,177 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api import poe_api
+from api.http_cache import ResponseCache, cache_key
+from api.http_client import Response
+from api.poe_async import AsyncHTTPClient, AsyncLoopThread, AsyncPoeClient
+from api.rate_limit import RateLimitGovernor
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        if self.path.startswith("/chunked"):
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(body), 5):
+                part = body[start:start + 5]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("localhost", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield f"http://localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_many_concurrent_requests_share_few_connections(server):
+    async def run():
+        client = AsyncHTTPClient(max_per_host=4)
+        responses = await asyncio.gather(
+            *(client.get(f"{server}/stash/{i}") for i in range(50))
+        )
+        await client.close()
+        return client, responses
+
+    client, responses = asyncio.run(run())
+    assert [r.json()["path"] for r in responses] == [f"/stash/{i}" for i in range(50)]
+    assert client.connections_opened <= 4
+
+
+def test_chunked_responses_are_decoded(server):
+    async def run():
+        client = AsyncHTTPClient()
+        resp = await client.get(f"{server}/chunked/body")
+        await client.close()
+        return resp
+
+    assert asyncio.run(run()).json() == {"path": "/chunked/body"}
+
+
+def test_async_fetch_currency_shares_snapshot(monkeypatch, tmp_path):
+    pages = {
+        "/profile/stash-tabs": {"tabs": [{"id": "a"}, {"id": "b"}]},
+        "/stash/a": {"items": [{"typeLine": "Chaos Orb", "stackSize": 3}]},
+        "/stash/b": {"items": [{"typeLine": "Chaos Orb", "stackSize": 4}]},
+    }
+    requested = []
+
+    class FakeHTTP:
+        async def get(self, url, headers=None):
+            path = url.split("pathofexile.com", 1)[1].split("?")[0]
+            requested.append(path)
+            return Response(200, {}, json.dumps(pages[path]).encode())
+
+    monkeypatch.setattr(poe_api, "rate_limiter", RateLimitGovernor())
+    monkeypatch.setattr(poe_api, "response_cache", ResponseCache(str(tmp_path)))
+    monkeypatch.setattr(poe_api, "_snapshots", {})
+
+    async def run():
+        client = AsyncPoeClient(FakeHTTP())
+        return await asyncio.gather(
+            client.fetch_currency("tok", "Standard", ["Chaos Orb"]),
+            client.fetch_item_count("tok", "Standard", "chaos orb"),
+        )
+
+    assert asyncio.run(run()) == [{"Chaos Orb": 7}, 7]
+    assert sorted(requested) == ["/profile/stash-tabs", "/stash/a", "/stash/b"]
+    # The blocking API reads the same snapshot without new requests.
+    assert poe_api.fetch_item_count("tok", "Standard", "Chaos Orb") == 7
+    assert len(requested) == 3
+
+
+def test_async_streaming_refresh_keeps_no_decoded_tabs(monkeypatch, tmp_path):
+    pages = {
+        "/profile/stash-tabs": {"tabs": [{"id": "a"}]},
+        "/stash/a": {"items": [{"typeLine": "Chaos Orb", "stackSize": 3}]},
+    }
+
+    class FakeHTTP:
+        async def get(self, url, headers=None):
+            path = url.split("pathofexile.com", 1)[1].split("?")[0]
+            if (headers or {}).get("If-None-Match") == '"v1"':
+                return Response(304, {"ETag": '"v1"'}, b"")
+            return Response(200, {"ETag": '"v1"'}, json.dumps(pages[path]).encode())
+
+    cache = ResponseCache(str(tmp_path))
+    monkeypatch.setattr(poe_api, "rate_limiter", RateLimitGovernor())
+    monkeypatch.setattr(poe_api, "response_cache", cache)
+    snapshot = poe_api.StashSnapshot("tok", "Standard", streaming=True)
+
+    async def run():
+        client = AsyncPoeClient(FakeHTTP())
+        await client.refresh_snapshot(snapshot)
+        await client.refresh_snapshot(snapshot, full=True)
+
+    asyncio.run(run())
+    assert snapshot.currency_counts(["Chaos Orb"]) == {"Chaos Orb": 3}
+    assert cache.metrics()["entries"] == 2
+    # Only the small listing is kept decoded, never a tab.
+    assert list(cache._decoded) == [cache_key(snapshot.tabs_url(), poe_api.STASH_SCOPE)]
+
+
+def test_async_refresh_waits_for_blocking_refresh(monkeypatch):
+    requested = []
+
+    class FakeHTTP:
+        async def get(self, url, headers=None):
+            requested.append(url)
+            raise AssertionError("the blocking refresh already made it fresh")
+
+    monkeypatch.setattr(poe_api, "_snapshots", {})
+    snapshot = poe_api.shared_snapshot("tok", "Standard")
+    snapshot.refresh_lock.acquire()
+
+    def finish_blocking_refresh():
+        snapshot.fetched_at = time.monotonic()
+        snapshot.refresh_lock.release()
+
+    timer = threading.Timer(0.1, finish_blocking_refresh)
+    timer.start()
+    result = asyncio.run(AsyncPoeClient(FakeHTTP()).get_stash_snapshot("tok", "Standard"))
+    timer.join()
+    assert result is snapshot
+    assert requested == []
+    assert not snapshot.refresh_lock.locked()
+
+
+def test_loop_thread_runs_coroutines():
+    async def answer():
+        await asyncio.sleep(0)
+        return 42
+
+    loop = AsyncLoopThread()
+    try:
+        assert loop.submit(answer()).result(timeout=5) == 42
+    finally:
+        loop.stop()
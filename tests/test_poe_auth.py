@@ -149,3 +149,269 @@ def test_callback_error(monkeypatch):
     assert server.code is None
 
 
+
+
+def test_load_token_reads_file_only_when_changed(monkeypatch, tmp_path):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(path))
+    cache = poe_auth._TokenCache()
+    monkeypatch.setattr(poe_auth, "_token_cache", cache)
+
+    assert poe_auth.load_token() is None
+    poe_auth._save_token({"access_token": "abc", "refresh_token": "def"})
+    for _ in range(5):
+        assert poe_auth.load_token()["access_token"] == "abc"
+    assert cache.reads == 0
+
+    # Mutating the returned dict must not leak into the cache.
+    poe_auth.load_token()["access_token"] = "changed"
+    assert poe_auth.load_token()["access_token"] == "abc"
+
+    # Another process rewriting the file is noticed.
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"access_token": "other-process", "refresh_token": "x"}, f)
+    os.utime(path, ns=(0, 1))
+    assert poe_auth.load_token()["access_token"] == "other-process"
+    assert cache.reads == 1
+
+    path.unlink()
+    assert poe_auth.load_token() is None
+
+
+def _install_fake_refresh(monkeypatch, name, calls):
+    def fake_refresh(token):
+        calls.append(token["refresh_token"])
+        time.sleep(0.05)
+        new = dict(token)
+        new.update(
+            access_token=f"access-{len(calls)}",
+            refresh_token=f"refresh-{len(calls)}",
+            expires_at=time.time() + 3600,
+        )
+        poe_auth._save_token(new)
+        return new
+
+    monkeypatch.setattr(poe_auth, name, fake_refresh)
+
+
+@pytest.mark.parametrize("public", [False, True])
+def test_concurrent_refresh_happens_once(monkeypatch, tmp_path, public):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(path))
+    monkeypatch.setattr(poe_auth, "_token_cache", poe_auth._TokenCache())
+    expired = {"access_token": "a", "refresh_token": "r0", "expires_at": time.time() - 1}
+    if public:
+        expired.update(client_id="acc", public=True)
+    poe_auth._save_token(expired)
+
+    calls = []
+    _install_fake_refresh(
+        monkeypatch, "refresh_token_public" if public else "refresh_token", calls
+    )
+
+    def ensure():
+        if public:
+            return poe_auth.ensure_valid_token_public("acc")
+        return poe_auth.ensure_valid_token()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ensure())) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ["r0"]
+    assert {r["access_token"] for r in results} == {"access-1"}
+
+
+def test_refresher_renews_before_expiry(monkeypatch, tmp_path):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(path))
+    monkeypatch.setattr(poe_auth, "_token_cache", poe_auth._TokenCache())
+    calls = []
+    _install_fake_refresh(monkeypatch, "refresh_token", calls)
+
+    refresher = poe_auth.TokenRefresher(margin=300)
+    poe_auth._save_token(
+        {"access_token": "a", "refresh_token": "r0", "expires_at": time.time() + 3600}
+    )
+    assert refresher.run_once() == poe_auth.REFRESH_POLL
+    assert calls == []
+
+    # Inside the margin: renewed although not expired yet.
+    poe_auth._save_token(
+        {"access_token": "a", "refresh_token": "r0", "expires_at": time.time() + 100}
+    )
+    refresher.run_once()
+    assert calls == ["r0"]
+    assert refresher.refreshes == 1
+    assert poe_auth.load_token()["access_token"] == "access-1"
+
+
+def test_refresher_retries_after_failure(monkeypatch, tmp_path):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(path))
+    monkeypatch.setattr(poe_auth, "_token_cache", poe_auth._TokenCache())
+    poe_auth._save_token(
+        {"access_token": "a", "refresh_token": "r0", "expires_at": time.time() - 1}
+    )
+
+    def failing_refresh(token):
+        raise RuntimeError("Token refresh failed: 500")
+
+    monkeypatch.setattr(poe_auth, "refresh_token", failing_refresh)
+    refresher = poe_auth.TokenRefresher()
+    assert refresher.run_once() == poe_auth.REFRESH_RETRY
+    assert refresher.failures == 1
+
+
+def test_token_store_serves_scopes_from_superset(monkeypatch, tmp_path):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(path))
+    monkeypatch.setattr(poe_auth, "_token_cache", poe_auth._TokenCache())
+    future = time.time() + 3600
+
+    poe_auth._save_token(
+        {"access_token": "profile", "refresh_token": "r1", "expires_at": future, "scope": "account:profile"}
+    )
+    poe_auth._save_token(
+        {
+            "access_token": "public",
+            "refresh_token": "r2",
+            "expires_at": future,
+            "scope": "account:profile",
+            "client_id": "acc",
+            "public": True,
+        }
+    )
+    assert poe_auth.load_token("account:stashes") is None
+    assert poe_auth.load_token("account:profile", client_id="acc")["access_token"] == "public"
+
+    # A wider token from the same client replaces the narrower one.
+    poe_auth._save_token(
+        {
+            "access_token": "both",
+            "refresh_token": "r3",
+            "expires_at": future,
+            "scope": "account:profile account:stashes",
+        }
+    )
+    stored = json.load(open(path, "r", encoding="utf-8"))["tokens"]
+    assert [t["access_token"] for t in stored] == ["public", "both"]
+
+    monkeypatch.setattr(poe_auth, "login", lambda scope=poe_auth.DEFAULT_SCOPE: pytest.fail("login"))
+    assert poe_auth.ensure_valid_token("account:stashes")["access_token"] == "both"
+    assert poe_auth.ensure_valid_token("account:profile")["access_token"] == "both"
+
+
+def test_legacy_token_only_covers_default_scope(monkeypatch, tmp_path):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(path))
+    monkeypatch.setattr(poe_auth, "_token_cache", poe_auth._TokenCache())
+    future = time.time() + 3600
+    # Written by a version that stored one token without its scope.
+    path.write_text(json.dumps({"access_token": "old", "refresh_token": "r1", "expires_at": future}))
+
+    assert poe_auth.load_token(poe_auth.DEFAULT_SCOPE)["access_token"] == "old"
+    assert poe_auth.load_token("account:stashes") is None
+
+    poe_auth._save_token(
+        {"access_token": "new", "refresh_token": "r2", "expires_at": future, "scope": poe_auth.OVERLAY_SCOPE}
+    )
+    stored = json.load(open(path, "r", encoding="utf-8"))["tokens"]
+    assert [t["access_token"] for t in stored] == ["new"]
+
+
+def test_ensure_valid_token_never_starts_a_login(monkeypatch, tmp_path):
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(tmp_path / "token.json"))
+    monkeypatch.setattr(poe_auth, "_token_cache", poe_auth._TokenCache())
+    monkeypatch.setattr(poe_auth, "login", lambda *args, **kwargs: pytest.fail("login"))
+    monkeypatch.setattr(poe_auth, "login_public", lambda *args, **kwargs: pytest.fail("login"))
+
+    with pytest.raises(poe_auth.NotLoggedIn):
+        poe_auth.ensure_valid_token("account:stashes")
+    with pytest.raises(poe_auth.NotLoggedIn):
+        poe_auth.ensure_valid_token_public("acc", "account:stashes")
+
+
+def test_callback_server_falls_back_to_free_port(monkeypatch):
+    busy = poe_auth._AuthServer(("localhost", 0), "busy")
+    monkeypatch.setattr(poe_auth, "CALLBACK_PORT", busy.server_address[1])
+    try:
+        server = poe_auth._open_callback_server("xyz")
+        with server:
+            port = server.server_address[1]
+            assert port != busy.server_address[1]
+            assert server.redirect_uri == f"http://localhost:{port}/callback"
+    finally:
+        busy.server_close()
+
+
+def test_login_wait_can_be_cancelled(monkeypatch):
+    monkeypatch.setattr(poe_auth, "CALLBACK_POLL", 0.01)
+    server = poe_auth._AuthServer(("localhost", 0), "xyz")
+    cancel = threading.Event()
+    errors = []
+
+    def wait():
+        try:
+            poe_auth._wait_for_code(server, cancel)
+        except poe_auth.LoginCancelled as exc:
+            errors.append(exc)
+
+    t = threading.Thread(target=wait)
+    t.start()
+    cancel.set()
+    t.join(2)
+    assert not t.is_alive()
+    assert len(errors) == 1
+
+
+def test_login_wait_returns_code():
+    server = poe_auth._AuthServer(("localhost", 0), "xyz")
+    port = server.server_address[1]
+    result = []
+    t = threading.Thread(target=lambda: result.append(poe_auth._wait_for_code(server)))
+    t.start()
+
+    conn = http.client.HTTPConnection("localhost", port)
+    conn.request("GET", "/callback?state=xyz&code=abc")
+    conn.getresponse().read()
+    conn.close()
+    t.join(2)
+    assert result == ["abc"]
+
+
+def test_concurrent_saves_keep_every_token(monkeypatch, tmp_path):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(path))
+    monkeypatch.setattr(poe_auth, "_token_cache", poe_auth._TokenCache())
+
+    def save(n):
+        poe_auth._save_token({"access_token": str(n), "public": True, "client_id": f"c{n}"})
+
+    threads = [threading.Thread(target=save, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with open(path, encoding="utf-8") as f:
+        stored = json.load(f)["tokens"]
+    assert sorted(t["access_token"] for t in stored) == [str(n) for n in range(8)]
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert os.listdir(tmp_path) == ["token.json"]
+
+
+def test_partially_written_token_file_is_not_an_error(monkeypatch, tmp_path):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(poe_auth, "TOKEN_FILE", str(path))
+    monkeypatch.setattr(poe_auth, "_token_cache", poe_auth._TokenCache())
+
+    path.write_text('{"tokens": [', encoding="utf-8")
+    assert poe_auth.load_token() is None
+
+    poe_auth._save_token({"access_token": "abc"})
+    path.write_text('{"tokens": [{"access', encoding="utf-8")
+    assert poe_auth.load_token()["access_token"] == "abc"
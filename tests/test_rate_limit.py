@@ -0,0 +1,94 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api import rate_limit
+from api.rate_limit import RateLimitGovernor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _governor():
+    clock = FakeClock()
+    return RateLimitGovernor(clock=clock, sleep=clock.sleep), clock
+
+
+HEADERS = {
+    "X-Rate-Limit-Policy": "stash-request-limit",
+    "X-Rate-Limit-Rules": "Account",
+    "X-Rate-Limit-Account": "3:10:60",
+    "X-Rate-Limit-Account-State": "1:10:0",
+}
+
+
+def test_endpoint_key_groups_by_first_segment():
+    key = rate_limit.endpoint_key("https://api.pathofexile.com/stash/abc?league=Std")
+    assert key == "api.pathofexile.com/stash"
+
+
+def test_parse_windows_skips_malformed():
+    assert rate_limit._parse_windows("3:10:60, bad,5:60:0") == [(3, 10, 60), (5, 60, 0)]
+
+
+def test_unknown_endpoint_allows_single_probe():
+    governor, _ = _governor()
+    assert governor.reserve("stash") == 0
+    assert governor.reserve("stash") == rate_limit.PROBE_WAIT
+    governor.update("stash", HEADERS)
+    assert governor.reserve("stash") == 0
+
+
+def test_waits_when_window_is_full():
+    governor, clock = _governor()
+    governor.acquire("stash")
+    governor.update("stash", HEADERS)
+    governor.acquire("stash")
+    governor.acquire("stash")
+    start = clock.now
+    waited = governor.acquire("stash")
+    assert waited > 0
+    assert clock.now - start >= 10
+    metrics = governor.metrics()
+    assert metrics["waits"] == 1
+    assert metrics["wait_seconds"] == waited
+
+
+def test_server_state_counts_foreign_hits():
+    governor, _ = _governor()
+    governor.acquire("stash")
+    headers = dict(HEADERS, **{"X-Rate-Limit-Account-State": "3:10:0"})
+    governor.update("stash", headers)
+    assert governor.reserve("stash") > 0
+
+
+def test_retry_after_blocks_policy():
+    governor, clock = _governor()
+    governor.acquire("stash")
+    governor.update("stash", {"Retry-After": "30"}, status=429)
+    assert governor.reserve("stash") == 30
+    clock.now += 30
+    assert governor.reserve("stash") == 0
+    assert governor.metrics()["throttled"] == 1
+
+
+def test_delay_hint_does_not_spend_tokens():
+    governor, clock = _governor()
+    assert governor.delay_hint("stash") == 0
+    governor.acquire("stash")
+    headers = dict(HEADERS, **{"X-Rate-Limit-Account-State": "3:10:0"})
+    governor.update("stash", headers)
+    hint = governor.delay_hint("stash")
+    assert hint > 0
+    assert governor.delay_hint("stash") == hint
+    clock.now += hint
+    assert governor.delay_hint("stash") == 0
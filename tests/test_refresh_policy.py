@@ -0,0 +1,76 @@
+import os
+import sys
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from ui.modules.refresh_policy import AdaptiveInterval, RefreshPlan
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_interval_backs_off_and_recovers():
+    policy = AdaptiveInterval(base=30, minimum=15, maximum=100)
+    assert policy.record(changed=False) == 45
+    assert policy.record(error=True) == 90
+    assert policy.record(error=True) == 100  # capped
+    assert policy.failures == 2
+    assert policy.record(changed=True) == 50
+    assert policy.failures == 0
+    assert policy.record(changed=True) == 25
+    assert policy.record(changed=True) == 15  # floor
+
+
+def test_plan_runs_due_tasks_once_until_reported():
+    clock = FakeClock()
+    plan = RefreshPlan(clock=clock)
+    plan.register("currency", callback=None)
+    assert [t.name for t in plan.due()] == ["currency"]
+    # Still running: not handed out again and not counted as pending.
+    assert plan.due() == []
+    assert plan.seconds_until_next() is None
+
+    plan.report("currency", changed=False)
+    assert plan.seconds_until_next() == 45
+    clock.now += 44
+    assert plan.due() == []
+    clock.now += 1
+    assert [t.name for t in plan.due()] == ["currency"]
+
+
+def test_plan_pause_and_trigger():
+    clock = FakeClock()
+    plan = RefreshPlan(clock=clock)
+    plan.register("currency", callback=None, start_now=False)
+    assert plan.seconds_until_next() == 30
+
+    plan.paused = True
+    plan.trigger("currency")
+    assert plan.due() == []
+    assert plan.seconds_until_next() is None
+
+    plan.paused = False
+    assert plan.seconds_until_next() == 0
+    assert len(plan.due()) == 1
+
+
+def test_plan_postpones_rate_limited_endpoints():
+    clock = FakeClock()
+    waits = {"api.pathofexile.com/stash": 12.0}
+    plan = RefreshPlan(delay_hint=lambda endpoint: waits.get(endpoint, 0), clock=clock)
+    plan.register("currency", callback=None, endpoint="api.pathofexile.com/stash")
+    plan.register("other", callback=None)
+
+    assert [t.name for t in plan.due()] == ["other"]
+    assert plan.seconds_until_next() == 12
+
+    waits.clear()
+    clock.now += 12
+    assert [t.name for t in plan.due()] == ["currency"]
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def _wait_for_followers(flight, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while flight.coalesced < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def _run_concurrently(flight, fn, callers=5):
+    results = []
+    errors = []
+
+    def call():
+        try:
+            results.append(flight.do("stash/a", fn))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    invoked = []
+
+    def fetch():
+        invoked.append(1)
+        _wait_for_followers(flight, 4)
+        return {"items": []}
+
+    results, errors = _run_concurrently(flight, fetch)
+    assert not errors
+    assert len(invoked) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.metrics() == {"calls": 1, "coalesced": 4}
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def fail():
+        _wait_for_followers(flight, 2)
+        raise RuntimeError("Failed request: 503")
+
+    results, errors = _run_concurrently(flight, fail, callers=3)
+    assert not results
+    assert [str(e) for e in errors] == ["Failed request: 503"] * 3
+    assert flight.do("stash/a", lambda: "ok") == "ok"
+
+
+def test_async_callers_share_one_call():
+    flight = AsyncSingleFlight()
+    invoked = []
+
+    async def fetch():
+        invoked.append(1)
+        await asyncio.sleep(0.01)
+        return {"items": []}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("stash/a", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(invoked) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.metrics()["coalesced"] == 4
+
+
+def test_async_errors_propagate_to_waiters():
+    flight = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.do("k", fail) for _ in range(3)), return_exceptions=True
+        )
+
+    assert [str(e) for e in asyncio.run(run())] == ["boom"] * 3
+
+
+def test_cancelled_async_caller_leaves_the_call_running():
+    flight = AsyncSingleFlight()
+    invoked = []
+
+    async def fetch():
+        invoked.append(1)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        return leader.cancelled(), result
+
+    assert asyncio.run(run()) == (True, "ok")
+    assert len(invoked) == 1
+
+
+def test_call_is_cancelled_once_every_caller_gives_up():
+    flight = AsyncSingleFlight()
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        callers = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [1]
+    assert flight._calls == {}
@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+# Seconds from the profiler starting at the top of main.py to the first paint.
+# Interpreter startup itself is not included. Override to tune for slower
+# machines.
+BUDGET = float(os.environ.get("EXILEDOVERLAY_STARTUP_BUDGET", "3.0"))
+
+
+def test_cold_start_within_budget(tmp_path):
+    report = tmp_path / "startup.json"
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", HOME=str(tmp_path))
+    env.pop("EXILEDOVERLAY_PROFILE", None)
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.join(ROOT, "main.py"),
+            f"--profile-startup={report}",
+            "--exit-after-startup",
+        ],
+        check=True,
+        cwd=tmp_path,
+        env=env,
+        timeout=60,
+    )
+    data = json.loads(report.read_text(encoding="utf-8"))
+    first_paint = data["marks"]["first_paint"]
+    assert first_paint <= BUDGET, (
+        f"cold start took {first_paint:.2f}s, budget is {BUDGET:.2f}s; "
+        f"slowest imports: {[s['name'] for s in data['spans']['import'][:5]]}"
+    )
@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from ui.modules import startup_profiler
+from ui.modules.startup_profiler import StartupProfiler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_nested_spans_report_self_time():
+    clock = FakeClock()
+    profiler = StartupProfiler(clock)
+    with profiler.span("view", "Currency"):
+        clock.now += 0.1
+        with profiler.span("import", "ui.currency_view"):
+            clock.now += 0.3
+    clock.now += 0.1
+    profiler.mark("first_paint")
+
+    summary = profiler.summary()
+    assert summary["marks"] == {"first_paint": 0.5}
+    view = summary["spans"]["view"][0]
+    assert view["name"] == "Currency"
+    assert round(view["duration"], 6) == 0.4
+    assert round(view["self"], 6) == 0.1
+    assert "ui.currency_view" in profiler.report()
+
+
+def test_import_hook_times_new_modules(tmp_path, monkeypatch):
+    (tmp_path / "profiled_fixture_mod.py").write_text("import json\nVALUE = 1\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    profiler = StartupProfiler()
+    profiler.install_import_hook()
+    try:
+        import profiled_fixture_mod  # noqa: F401
+        import json  # noqa: F401  already loaded, not recorded
+    finally:
+        profiler.uninstall_import_hook()
+        sys.modules.pop("profiled_fixture_mod", None)
+    assert [s.name for s in profiler.spans] == ["profiled_fixture_mod"]
+
+
+def test_enable_from_flags_and_environment(tmp_path, monkeypatch):
+    monkeypatch.setattr(startup_profiler, "_profiler", None)
+    monkeypatch.setattr(startup_profiler, "exit_after_startup", False)
+    assert startup_profiler.enable_from(["main.py"], {}) is None
+    assert startup_profiler.finish() is None
+
+    report = tmp_path / "profile.json"
+    argv = ["main.py", f"--profile-startup={report}", "--exit-after-startup", "-style"]
+    profiler = startup_profiler.enable_from(argv, {})
+    try:
+        assert profiler is startup_profiler.active()
+        assert argv == ["main.py", "-style"]
+        assert startup_profiler.exit_after_startup
+        with startup_profiler.span("startup", "OverlayWindow"):
+            pass
+    finally:
+        assert startup_profiler.finish() == str(report)
+    data = json.loads(report.read_text(encoding="utf-8"))
+    assert "first_paint" in data["marks"]
+    assert data["spans"]["startup"][0]["name"] == "OverlayWindow"
+
+    monkeypatch.setattr(startup_profiler, "_profiler", None)
+    text_report = tmp_path / "profile.txt"
+    startup_profiler.enable_from(["main.py"], {startup_profiler.ENV_VAR: str(text_report)})
+    startup_profiler.finish()
+    assert text_report.read_text(encoding="utf-8").startswith("Startup profile")
@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from api.stash_index import StashIndex, TabIndex, normalize
+
+
+def _tab(*items):
+    tab = TabIndex()
+    for item in items:
+        tab.add_item(item)
+    return tab
+
+
+def test_normalize_ignores_case_and_spacing():
+    assert normalize("  Chaos   ORB ") == "chaos orb"
+
+
+def test_item_is_counted_once_under_each_name():
+    index = StashIndex()
+    index.replace_tab("a", _tab(
+        {"typeLine": "Leather Belt", "name": "Headhunter", "x": 1, "y": 2},
+        {"typeLine": "Chaos Orb", "name": "Chaos Orb", "stackSize": 7},
+    ))
+    assert index.counts(["headhunter", "Leather Belt", "Chaos Orb"]) == {
+        "headhunter": 1,
+        "Leather Belt": 1,
+        "Chaos Orb": 7,
+    }
+    assert index.locations("Headhunter") == [{"tab": "a", "x": 1, "y": 2, "stack": 1}]
+
+
+def test_replacing_and_removing_tabs_updates_totals():
+    index = StashIndex()
+    index.replace_tab("a", _tab({"typeLine": "Chaos Orb", "stackSize": 10}))
+    index.replace_tab("b", _tab({"typeLine": "Chaos Orb", "stackSize": 5}))
+    assert index.count("Chaos Orb") == 15
+    assert index.tab_totals("Chaos Orb") == {"a": 10, "b": 5}
+
+    index.replace_tab("a", _tab({"typeLine": "Divine Orb"}))
+    assert index.count("Chaos Orb") == 5
+    assert index.count("Divine Orb") == 1
+
+    index.remove_tab("b")
+    assert index.count("Chaos Orb") == 0
+    assert index.tab_totals("Chaos Orb") == {}
+    assert index.tab_ids() == ["a"]
+
+
+def test_removing_tabs_with_zero_stacks():
+    index = StashIndex()
+    for tab_id in ("a", "b"):
+        tab = TabIndex()
+        tab.add_item({"typeLine": "Chaos Orb", "stackSize": 0})
+        index.replace_tab(tab_id, tab)
+    index.remove_tab("a")
+    index.remove_tab("b")
+    assert index.count("Chaos Orb") == 0
+    assert index.tab_totals("Chaos Orb") == {}
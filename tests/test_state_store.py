@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from ui.modules.currency import CurrencyRepository
+from ui.modules import state_store
+from ui.modules.state_store import StateStore
+from ui.modules.tracker import TrackerRepository
+
+
+def _store(tmp_path):
+    return StateStore(str(tmp_path / "data" / "state.db"))
+
+
+def test_store_uses_wal_and_is_migrated(tmp_path):
+    store = _store(tmp_path)
+    assert store.query("PRAGMA journal_mode")[0][0] == "wal"
+    assert store.query("PRAGMA user_version")[0][0] == 1
+    store.close()
+    # Reopening an up-to-date database does not run the migrations again.
+    store = _store(tmp_path)
+    assert store.query("PRAGMA user_version")[0][0] == 1
+
+
+def test_tracker_rows_are_saved_individually(tmp_path):
+    store = _store(tmp_path)
+    repo = TrackerRepository(store)
+    first = repo.save({"item": "Chaos Orb", "current": 1, "target": 10})
+    second = repo.save({"item": "Divine Orb", "current": 0, "target": 5})
+    assert first["id"] != second["id"]
+
+    first["current"] = 7
+    repo.save(first)
+    repo.remove(second["id"])
+    third = repo.save({"item": "Mirror", "current": 0, "target": 1})
+    store.close()
+
+    reopened = TrackerRepository(_store(tmp_path))
+    assert reopened.all() == [
+        {"id": first["id"], "item": "Chaos Orb", "current": 7, "target": 10},
+        {"id": third["id"], "item": "Mirror", "current": 0, "target": 1},
+    ]
+
+
+def test_currency_counts_upsert(tmp_path):
+    repo = CurrencyRepository(_store(tmp_path))
+    repo.set_many({"Chaos Orb": 3, "Divine Orb": 1})
+    repo.set_many({"Chaos Orb": 4})
+    assert repo.all() == {"Chaos Orb": 4, "Divine Orb": 1}
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    (legacy / "trackers.json").write_text(
+        json.dumps([{"item": "Chaos Orb", "current": 2, "target": 10}]), encoding="utf-8"
+    )
+    (legacy / "currency.json").write_text(json.dumps({"Chaos Orb": 12}), encoding="utf-8")
+    (legacy / "friends.json").write_text("{not json", encoding="utf-8")
+
+    store = _store(tmp_path)
+    assert store.import_legacy_json(str(legacy)) == ["trackers", "currency"]
+    assert store.import_legacy_json(str(legacy)) == []
+    assert [t["item"] for t in TrackerRepository(store).all()] == ["Chaos Orb"]
+    assert CurrencyRepository(store).all() == {"Chaos Orb": 12}
+
+    # The unreadable file is left in place and imported once it is fixed.
+    assert (legacy / "friends.json").exists()
+    (legacy / "friends.json").write_text(
+        json.dumps([{"name": "someone", "status": "Unknown", "last_seen": "Never"}]),
+        encoding="utf-8",
+    )
+    assert store.import_legacy_json(str(legacy)) == ["friends"]
+
+
+def test_failed_begin_releases_the_store_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, "BUSY_TIMEOUT", 0.05)
+    store = _store(tmp_path)
+    other = sqlite3.connect(store.path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    with pytest.raises(sqlite3.OperationalError):
+        with store.transaction():
+            pass
+
+    acquired = []
+
+    def take_lock():
+        acquired.append(store._lock.acquire(timeout=1))
+        if acquired[-1]:
+            store._lock.release()
+
+    worker = threading.Thread(target=take_lock)
+    worker.start()
+    worker.join()
+    assert acquired == [True]
+
+    other.execute("ROLLBACK")
+    with store.transaction() as conn:
+        conn.execute("INSERT INTO meta (key, value) VALUES ('k', 'v')")
+    assert store.get_meta("k") == "v"
+
@@ -0,0 +1,21 @@
+import os
+import sys
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from ui.modules.tracker import is_complete, progress, tracker_text
+
+
+def test_tracker_text_shows_progress():
+    tracker = {"item": "Chaos Orb", "current": 25, "target": 200}
+    assert tracker_text(tracker) == "Chaos Orb: 25/200 (12.5%)"
+    assert not is_complete(tracker)
+
+
+def test_zero_target_counts_as_complete():
+    tracker = {"item": "Divine Orb", "current": 0, "target": 0}
+    assert progress(tracker) == 100.0
+    assert is_complete(tracker)
+    assert tracker_text(tracker) == "Divine Orb: 0/0 (100.0%)"
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+
+# Ensure the repository root is on the Python path when running "pytest" as an
+# installed command.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from ui.modules import write_behind
+from ui.modules.write_behind import WriteBehind
+
+
+def test_rapid_writes_are_coalesced():
+    queue = WriteBehind(delay=60, max_delay=60)
+    written = []
+    row = {"current": 0}
+    for _ in range(100):
+        row["current"] += 1
+        queue.schedule(("trackers", 1), lambda value: written.append(value), row["current"])
+    queue.schedule(("trackers", 2), written.append, "other")
+    assert written == []
+
+    queue.flush()
+    assert written == [100, "other"]
+    metrics = queue.metrics()
+    assert metrics["writes"] == 2
+    assert metrics["saved"] == 99
+    assert metrics["pending"] == 0
+    queue.close()
+
+
+def test_worker_flushes_after_delay():
+    queue = WriteBehind(delay=0.01, max_delay=1)
+    done = threading.Event()
+    queue.schedule("currency", done.set)
+    assert done.wait(2)
+    queue.close()
+
+
+def test_close_flushes_and_later_writes_run_immediately():
+    queue = WriteBehind(delay=60, max_delay=60)
+    written = []
+    queue.schedule("a", written.append, 1)
+    queue.close()
+    assert written == [1]
+    queue.schedule("a", written.append, 2)
+    assert written == [1, 2]
+
+
+def test_failed_write_does_not_stop_the_batch():
+    queue = WriteBehind(delay=60, max_delay=60)
+    written = []
+
+    def fail():
+        raise OSError("disk full")
+
+    queue.schedule("a", fail)
+    queue.schedule("b", written.append, "b")
+    queue.flush()
+    assert written == ["b"]
+    assert queue.metrics()["failures"] == 1
+    queue.close()
+
+
+def test_close_hook_only_closes_a_queue_in_use(monkeypatch):
+    monkeypatch.setattr(write_behind, "_queue", None)
+    write_behind.close_write_behind()
+    assert write_behind._queue is None
+
+    queue = write_behind.write_behind()
+    written = []
+    queue.schedule("a", written.append, 1)
+    write_behind.close_write_behind()
+    assert written == [1]
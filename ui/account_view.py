@@ -7,13 +7,19 @@ from PyQt6.QtWidgets import (
     QLineEdit,
 )
 from PyQt6.QtCore import Qt
+import threading
 from api import poe_auth
+from ui.job_runner import job_runner
 
 class AccountView(QWidget):
     """Simple view for managing PoE account authorization."""
 
     def __init__(self) -> None:
         super().__init__()
+        self._login_cancel = None
+        # Started by the views that use tokens rather than at launch, so
+        # the collapsed overlay never reads the token file.
+        poe_auth.start_token_refresher()
         self._build_ui()
         self.update_status()
 
@@ -34,32 +40,77 @@ class AccountView(QWidget):
         layout.addWidget(self.account_input)
 
         self.login_btn = QPushButton()
-        self.login_btn.clicked.connect(self._login)
+        self.login_btn.clicked.connect(self._on_login_clicked)
         layout.addWidget(self.login_btn)
 
         layout.addStretch()
         self.setLayout(layout)
 
     def update_status(self) -> None:
-        token = poe_auth.load_token()
-        if token:
+        if self._login_cancel is not None:
+            self.status_label.setText("Waiting for browser login...")
+            self.login_btn.setText("Cancel Login")
+            return
+        if poe_auth.load_token(poe_auth.OVERLAY_SCOPE):
             self.status_label.setText("Logged in")
             self.login_btn.setText("Re-authorize")
+        elif poe_auth.load_token():
+            # A login from before the stash views existed; the Currency and
+            # Tracker views need a new one with every overlay scope.
+            self.status_label.setText("Stash access missing; please re-authorize")
+            self.login_btn.setText("Re-authorize")
         else:
             self.status_label.setText("Not logged in")
             self.login_btn.setText("Log In")
 
+    def _on_login_clicked(self) -> None:
+        if self._login_cancel is not None:
+            self._cancel_login()
+        else:
+            self._login()
+
     def _login(self) -> None:
-        try:
-            QMessageBox.information(
-                self, "Login", "A browser window will open for login.")
-            account = self.account_input.text().strip()
-            if account:
-                poe_auth.login_public(account)
-            else:
-                poe_auth.login()
-            QMessageBox.information(
-                self, "Login", "Authorization successful.")
-        except Exception as exc:  # pragma: no cover - integration path
-            QMessageBox.critical(self, "Login Failed", str(exc))
+        """Start the OAuth flow in the background; the GUI stays responsive."""
+        QMessageBox.information(
+            self, "Login", "A browser window will open for login.")
+        self._login_cancel = threading.Event()
+        account = self.account_input.text().strip()
+        if account:
+            job_runner().submit(
+                "login",
+                poe_auth.login_public,
+                account,
+                poe_auth.OVERLAY_SCOPE,
+                cancel=self._login_cancel,
+                on_result=self._on_login_finished,
+                on_error=self._on_login_failed,
+            )
+        else:
+            job_runner().submit(
+                "login",
+                poe_auth.login,
+                poe_auth.OVERLAY_SCOPE,
+                cancel=self._login_cancel,
+                on_result=self._on_login_finished,
+                on_error=self._on_login_failed,
+            )
+        self.update_status()
+
+    def _cancel_login(self) -> None:
+        # Stops the callback listener within CALLBACK_POLL seconds; the job's
+        # outcome is discarded.
+        self._login_cancel.set()
+        job_runner().cancel("login")
+        self._login_cancel = None
+        self.update_status()
+
+    def _on_login_finished(self, token) -> None:
+        self._login_cancel = None
+        QMessageBox.information(
+            self, "Login", "Authorization successful.")
+        self.update_status()
+
+    def _on_login_failed(self, message) -> None:
+        self._login_cancel = None
+        QMessageBox.critical(self, "Login Failed", message)
         self.update_status()
@@ -1,22 +1,49 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QGridLayout, QPushButton
 )
-from PyQt6.QtCore import Qt, QTimer
-import json
-import os
+from PyQt6.QtCore import Qt
+import sqlite3
+import time
 from api import poe_api, poe_auth
+from api.rate_limit import endpoint_key
+from ui.job_runner import job_runner
+from ui.modules.currency import CurrencyRepository, HistoryStore, diff_rows
+from ui.modules.state_store import state_store
+from ui.modules.write_behind import write_behind
+from ui.refresh_scheduler import refresh_scheduler
+
+STASH_ENDPOINT = endpoint_key(f"{poe_api.API_BASE}/stash/")
 
 class CurrencyView(QWidget):
     def __init__(self):
         super().__init__()
-        self.currency_file = "currency.json"
+        poe_auth.start_token_refresher()
+        self.repo = CurrencyRepository(state_store())
+        self.history = HistoryStore()
         self.currency_data = self.load_currency()
+        self._polling = False
+        self._rows = {}  # currency -> (name, amount, rate) labels
+        self._shown = {}  # currency -> (amount, rate) texts on screen
         self._build_ui()
-        
-        # Auto-refresh timer
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.refresh_currency)
-        self.timer.start(30000)  # Refresh every 30 seconds
+        # Rates are shown once the histories are read off the GUI thread.
+        job_runner().submit(
+            "currency-history",
+            self.history.load,
+            list(self.currency_data),
+            on_result=lambda _: self.update_display(),
+            on_error=lambda message: print(f"Error reading currency history: {message}"),
+        )
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._polling:
+            # Auto-refresh from the first time the view is shown; the
+            # scheduler adapts the interval to how often the counts change
+            # and pauses while the overlay is collapsed.
+            self._polling = True
+            refresh_scheduler().register(
+                "currency", self._refresh, endpoint=STASH_ENDPOINT
+            )
 
     def _build_ui(self):
         layout = QVBoxLayout()
@@ -32,6 +59,13 @@ class CurrencyView(QWidget):
         refresh_btn.clicked.connect(self.refresh_currency)
         layout.addWidget(refresh_btn)
         
+        # Why the last refresh failed, e.g. not logged in
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #ff7777;")
+        self.status_label.setWordWrap(True)
+        self.status_label.hide()
+        layout.addWidget(self.status_label)
+        
         # Currency grid
         self.currency_grid = QGridLayout()
         layout.addLayout(self.currency_grid)
@@ -53,55 +87,127 @@ class CurrencyView(QWidget):
             "Orb of Fusing": 0
         }
         
-        if os.path.exists(self.currency_file):
-            try:
-                with open(self.currency_file, 'r') as f:
-                    loaded = json.load(f)
-                    default_currency.update(loaded)
-            except:
-                pass
+        try:
+            default_currency.update(self.repo.all())
+        except sqlite3.Error as e:
+            print(f"Error loading currency: {e}")
         
         return default_currency
 
     def save_currency(self):
-        try:
-            with open(self.currency_file, 'w') as f:
-                json.dump(self.currency_data, f, indent=2)
-        except:
-            pass
+        """Queue the current counts to be saved in one transaction."""
+        write_behind().schedule("currency", self.repo.set_many, dict(self.currency_data))
 
     def update_display(self):
-        # Clear existing widgets
-        for i in reversed(range(self.currency_grid.count())):
-            self.currency_grid.itemAt(i).widget().setParent(None)
+        """Bring the grid in line with ``currency_data``.
+
+        Each currency keeps its row of labels; only texts that differ from
+        what is shown are set, and rows are only added or removed when the
+        set of currencies changes.
+        """
+        wanted = {
+            currency: (str(amount), self._rate_text(currency))
+            for currency, amount in self.currency_data.items()
+        }
+        added, removed, changed = diff_rows(self._shown, wanted)
+        if not (added or removed or changed):
+            return
+
+        for currency in removed:
+            for label in self._rows.pop(currency):
+                self.currency_grid.removeWidget(label)
+                label.deleteLater()
+        if removed:
+            # Close the gaps left by the removed rows.
+            for row, labels in enumerate(self._rows.values()):
+                for column, label in enumerate(labels):
+                    self.currency_grid.addWidget(label, row, column)
+
+        for currency in changed:
+            _, amount_label, rate_label = self._rows[currency]
+            amount, rate = wanted[currency]
+            old_amount, old_rate = self._shown[currency]
+            if amount != old_amount:
+                amount_label.setText(amount)
+            if rate != old_rate:
+                rate_label.setText(rate)
+
+        for currency in added:
+            self._rows[currency] = self._add_row(len(self._rows), currency, *wanted[currency])
+
+        self._shown = wanted
+
+    def _add_row(self, row, currency, amount, rate):
+        # Currency name
+        name_label = QLabel(currency)
+        name_label.setStyleSheet("color: white; font-weight: bold;")
+        self.currency_grid.addWidget(name_label, row, 0)
+        
+        # Amount
+        amount_label = QLabel(amount)
+        amount_label.setStyleSheet("color: #ffff77; font-size: 14px;")
+        amount_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        self.currency_grid.addWidget(amount_label, row, 1)
+        
+        # Income over the last hour
+        rate_label = QLabel(rate)
+        rate_label.setStyleSheet("color: #888; font-size: 12px;")
+        rate_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        self.currency_grid.addWidget(rate_label, row, 2)
         
-        row = 0
-        for currency, amount in self.currency_data.items():
-            # Currency name
-            name_label = QLabel(currency)
-            name_label.setStyleSheet("color: white; font-weight: bold;")
-            self.currency_grid.addWidget(name_label, row, 0)
-            
-            # Amount
-            amount_label = QLabel(str(amount))
-            amount_label.setStyleSheet("color: #ffff77; font-size: 14px;")
-            amount_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-            self.currency_grid.addWidget(amount_label, row, 1)
-            
-            row += 1
+        return name_label, amount_label, rate_label
+
+    def _rate_text(self, currency):
+        if not self.history.loaded(currency):
+            return ""
+        rate = self.history.rate(currency)
+        return "" if rate is None else f"{rate:+.1f}/h"
 
     def refresh_currency(self):
-        """Update currency counts using the PoE API."""
-        try:
-            token = poe_auth.ensure_valid_token("account:stashes")
-            counts = poe_api.fetch_currency(
-                token.get("access_token"),
-                "Standard",
-                list(self.currency_data.keys()),
-            )
-            self.currency_data.update(counts)
+        """Update currency counts using the PoE API as soon as possible."""
+        refresh_scheduler().trigger("currency")
+
+    def _refresh(self, task_name):
+        job_runner().submit(
+            "currency",
+            self._fetch_counts,
+            list(self.currency_data.keys()),
+            on_result=self._on_counts,
+            on_error=self._on_refresh_failed,
+        )
+
+    @staticmethod
+    def _fetch_counts(currencies):
+        token = poe_auth.ensure_valid_token("account:stashes")
+        return poe_api.fetch_currency(
+            token.get("access_token"),
+            "Standard",
+            currencies,
+        )
+
+    def _show_status(self, message):
+        self.status_label.setText(message)
+        self.status_label.setVisible(bool(message))
+
+    def _on_counts(self, counts):
+        self._show_status("")
+        changed = {k: v for k, v in counts.items() if self.currency_data.get(k) != v}
+        refresh_scheduler().report("currency", changed=bool(changed))
+        # Every refresh is offered; the history keeps only changes. Each
+        # sample gets its own key so none is coalesced away.
+        timestamp = time.time()
+        write_behind().schedule(
+            ("currency-history", timestamp), self.history.record, dict(counts), timestamp
+        )
+        if changed:
+            self.currency_data.update(changed)
             self.save_currency()
-        except Exception:
-            # Fall back to stored data if anything goes wrong
-            self.currency_data = self.load_currency()
+        # The hourly rates move even when the counts do not.
+        self.update_display()
+
+    def _on_refresh_failed(self, message):
+        refresh_scheduler().report("currency", error=True)
+        self._show_status(message)
+        # Keep showing the last known counts; they may not be flushed to
+        # the store yet, so reloading from it could go back in time.
         self.update_display()
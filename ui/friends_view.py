@@ -1,16 +1,19 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-    QPushButton, QListWidget, QListWidgetItem, QTextEdit
+    QPushButton, QListView, QTextEdit
 )
-from PyQt6.QtCore import Qt
-import json
-import os
+from ui.list_model import DictListModel
+from ui.modules.friends import FriendsRepository, friend_text
+from ui.modules.state_store import state_store
+from ui.modules.write_behind import write_behind
+import sqlite3
 
 class FriendsView(QWidget):
     def __init__(self):
         super().__init__()
-        self.friends_file = "friends.json"
+        self.repo = FriendsRepository(state_store())
         self.friends = self.load_friends()
+        self.model = DictListModel(self.friends, friend_text)
         self._build_ui()
 
     def _build_ui(self):
@@ -35,8 +38,9 @@ class FriendsView(QWidget):
         layout.addLayout(add_layout)
         
         # Friends list
-        self.friends_list = QListWidget()
-        self.friends_list.itemClicked.connect(self.show_friend_info)
+        self.friends_list = QListView()
+        self.friends_list.setModel(self.model)
+        self.friends_list.clicked.connect(self.show_friend_info)
         layout.addWidget(self.friends_list)
         
         # Friend info display
@@ -46,38 +50,33 @@ class FriendsView(QWidget):
         layout.addWidget(self.friend_info)
         
         self.setLayout(layout)
-        self.refresh_list()
 
     def load_friends(self):
-        if os.path.exists(self.friends_file):
-            try:
-                with open(self.friends_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-
-    def save_friends(self):
         try:
-            with open(self.friends_file, 'w') as f:
-                json.dump(self.friends, f, indent=2)
-        except:
-            pass
+            return self.repo.all()
+        except sqlite3.Error as e:
+            print(f"Error loading friends: {e}")
+            return []
+
+    def save_friends(self, *friends):
+        """Queue the given friends for saving."""
+        for friend in friends:
+            write_behind().schedule(("friends", id(friend)), self.repo.save, friend)
 
     def add_friend(self):
         friend_name = self.friend_input.text().strip()
         if friend_name and friend_name not in [f["name"] for f in self.friends]:
-            self.friends.append({
+            friend = {
                 "name": friend_name,
                 "status": "Unknown",
                 "last_seen": "Never"
-            })
-            self.save_friends()
-            self.refresh_list()
+            }
+            self.model.append(friend)
+            self.save_friends(friend)
             self.friend_input.clear()
 
-    def show_friend_info(self, item):
-        row = self.friends_list.row(item)
+    def show_friend_info(self, index):
+        row = index.row()
         if 0 <= row < len(self.friends):
             friend = self.friends[row]
             info = f"Name: {friend['name']}\n"
@@ -85,10 +84,3 @@ class FriendsView(QWidget):
             info += f"Last Seen: {friend['last_seen']}\n"
             info += "Note: Gear viewing requires API access"
             self.friend_info.setText(info)
-
-    def refresh_list(self):
-        self.friends_list.clear()
-        for friend in self.friends:
-            list_item = QListWidgetItem(f"{friend['name']} ({friend['status']})")
-            list_item.setForeground(Qt.GlobalColor.white)
-            self.friends_list.addItem(list_item)
\ No newline at end of file
@@ -1,9 +1,8 @@
 # ui/gear_view.py
 from PyQt6.QtWidgets import QWidget, QLabel, QGridLayout, QHBoxLayout, QVBoxLayout
-from PyQt6.QtGui import QPixmap
 from PyQt6.QtCore import Qt
-from urllib import request
 from api.poe_api import fetch_gear
+from ui.icon_loader import icon_loader
 
 def build_item_tooltip(item):
     rarity_colors = {
@@ -28,6 +27,10 @@ class GearView(QWidget):
     def __init__(self, gear_data):
         super().__init__()
         self.gear_data = gear_data
+        self._icon_labels = {}  # icon url -> [(label, (width, height))]
+        loader = icon_loader()
+        loader.loaded.connect(self._on_icon_loaded)
+        loader.failed.connect(self._on_icon_failed)
         self._build_ui()
 
     def _build_ui(self):
@@ -43,41 +46,11 @@ class GearView(QWidget):
         gear_grid.setSpacing(10)
 
         for slot, (row, col) in slot_map.items():
-            item = self.gear_data.get(slot)
-            label = QLabel()
-            if item and item.get("icon"):
-                try:
-                    with request.urlopen(item["icon"]) as resp:
-                        img_data = resp.read()
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(img_data)
-                    label.setPixmap(pixmap.scaled(60, 60, Qt.AspectRatioMode.KeepAspectRatio))
-                    label.setToolTip(build_item_tooltip(item))
-                except:
-                    label.setText(item["type"])
-            else:
-                label.setText("Empty")
-                label.setStyleSheet("color: gray;")
-            gear_grid.addWidget(label, row, col)
+            gear_grid.addWidget(self._slot_label(self.gear_data.get(slot), (60, 60)), row, col)
 
         flask_layout = QHBoxLayout()
         for slot in flask_slots:
-            item = self.gear_data.get(slot)
-            label = QLabel()
-            if item and item.get("icon"):
-                try:
-                    with request.urlopen(item["icon"]) as resp:
-                        img_data = resp.read()
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(img_data)
-                    label.setPixmap(pixmap.scaled(40, 60, Qt.AspectRatioMode.KeepAspectRatio))
-                    label.setToolTip(build_item_tooltip(item))
-                except:
-                    label.setText(item.get("type", "Unknown"))
-            else:
-                label.setText("Empty")
-                label.setStyleSheet("color: gray;")
-            flask_layout.addWidget(label)
+            flask_layout.addWidget(self._slot_label(self.gear_data.get(slot), (40, 60)))
 
         main_layout = QVBoxLayout()
         main_layout.addLayout(gear_grid)
@@ -85,3 +58,33 @@ class GearView(QWidget):
         main_layout.addLayout(flask_layout)
 
         self.setLayout(main_layout)
+
+    def _slot_label(self, item, size):
+        label = QLabel()
+        url = item.get("icon") if item else None
+        if not url:
+            label.setText("Empty")
+            label.setStyleSheet("color: gray;")
+            return label
+        label.setToolTip(build_item_tooltip(item))
+        pixmap = icon_loader().request(url)
+        if pixmap is not None:
+            self._set_icon(label, pixmap, size)
+            return label
+        # The item type stands in for the icon until it arrives, and stays
+        # if it cannot be loaded.
+        label.setText(item.get("type", "Unknown"))
+        label.setMinimumSize(*size)
+        self._icon_labels.setdefault(url, []).append((label, size))
+        return label
+
+    @staticmethod
+    def _set_icon(label, pixmap, size):
+        label.setPixmap(pixmap.scaled(*size, Qt.AspectRatioMode.KeepAspectRatio))
+
+    def _on_icon_loaded(self, url, pixmap):
+        for label, size in self._icon_labels.pop(url, ()):
+            self._set_icon(label, pixmap, size)
+
+    def _on_icon_failed(self, url, message):
+        self._icon_labels.pop(url, None)
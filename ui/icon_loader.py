@@ -0,0 +1,85 @@
+# ui/icon_loader.py
+"""Load item icons in the background.
+
+Views ask :func:`icon_loader` for an icon URL and show a placeholder until
+:attr:`IconLoader.loaded` delivers the pixmap. Decoded pixmaps stay in a
+size-bounded memory cache and the downloaded files in
+:class:`~ui.modules.icon_cache.IconDiskCache`, so icons seen before need no
+network request.
+"""
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QPixmap
+
+from ui.job_runner import JobRunner
+from ui.modules.icon_cache import MAX_MEMORY_BYTES, IconDiskCache, LRUCache, fetch_icon
+
+# Icons get their own threads so a page of downloads never delays the
+# API jobs on the shared runner.
+MAX_THREADS = 8
+
+
+class IconLoader(QObject):
+    """Fetches icons concurrently and emits them on the GUI thread."""
+
+    loaded = pyqtSignal(str, QPixmap)  # url, pixmap
+    failed = pyqtSignal(str, str)  # url, error message
+
+    def __init__(self, disk=None, max_memory=MAX_MEMORY_BYTES, parent=None):
+        super().__init__(parent)
+        self.disk = disk or IconDiskCache()
+        self.memory = LRUCache(max_memory)
+        self._runner = JobRunner(MAX_THREADS, self)
+
+    def request(self, url):
+        """Return the cached pixmap for ``url`` or start loading it.
+
+        Returns ``None`` when the icon is not in memory; :attr:`loaded` or
+        :attr:`failed` is emitted once it is. Requests for a URL already
+        being fetched share that download.
+        """
+        pixmap = self.memory.get(url)
+        if pixmap is not None:
+            return pixmap
+        if self._runner.is_running(url):
+            # The running download already emits once for every requester.
+            return None
+        self._runner.submit(
+            url,
+            fetch_icon,
+            url,
+            self.disk,
+            on_result=lambda data: self._on_data(url, data),
+            on_error=lambda message: self.failed.emit(url, message),
+        )
+        return None
+
+    def _on_data(self, url, data):
+        # QPixmap may only be created on the GUI thread.
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data):
+            self.disk.discard(url)
+            self.failed.emit(url, "Invalid image data")
+            return
+        self.memory.put(url, pixmap, pixmap.width() * pixmap.height() * 4)
+        self.loaded.emit(url, pixmap)
+
+    def shutdown(self):
+        self._runner.shutdown()
+
+
+_loader = None
+
+
+def icon_loader():
+    """Return the icon loader shared by every view."""
+    global _loader
+    if _loader is None:
+        _loader = IconLoader()
+    return _loader
+
+
+def shutdown_icon_loader():
+    """Drop pending icon downloads; does nothing if no icon was requested."""
+    if _loader is not None:
+        _loader.shutdown()
@@ -0,0 +1,182 @@
+# ui/job_runner.py
+"""Run blocking work (network, disk) off the Qt GUI thread.
+
+Views submit a callable under a key. The callable runs on a
+``QThreadPool`` and its result or error is delivered back on the GUI thread
+through Qt signals. Submitting a key that is already in flight does not start
+a second job; the new callbacks are attached to the running one instead.
+Cancelled jobs still run to completion if they already started but their
+results are discarded.
+
+Coroutines, such as those of :class:`api.poe_async.AsyncPoeClient`, can be
+submitted with :meth:`JobRunner.submit_async`; they run on the shared
+background event loop instead of occupying a pool thread each.
+"""
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from api import poe_async
+
+MAX_THREADS = 4
+
+
+class _JobSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    ended = pyqtSignal()
+
+
+class _Job(QRunnable):
+    def __init__(self, fn, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = _JobSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as exc:
+            if not self.cancelled:
+                self.signals.failed.emit(str(exc))
+        else:
+            if not self.cancelled:
+                self.signals.finished.emit(result)
+        finally:
+            self.signals.ended.emit()
+
+
+class _AsyncJob:
+    """A coroutine scheduled on the background event loop."""
+
+    def __init__(self):
+        self.cancelled = False
+        self.future = None
+        self.signals = _JobSignals()
+
+    def start(self, future):
+        self.future = future
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        # Runs on the event loop thread; the signals queue the result over
+        # to the GUI thread.
+        if self.cancelled or future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            self.signals.failed.emit(str(exc))
+        else:
+            self.signals.finished.emit(future.result())
+
+
+class JobRunner(QObject):
+    """De-duplicating background job queue with result signals."""
+
+    finished = pyqtSignal(str, object)  # key, result
+    failed = pyqtSignal(str, str)  # key, error message
+
+    def __init__(self, max_threads=MAX_THREADS, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(max_threads)
+        self._jobs = {}
+        # Every job that has not finished running, including cancelled ones,
+        # so Python keeps it alive while the pool still uses it.
+        self._alive = set()
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the background under ``key``.
+
+        ``on_result`` and ``on_error`` are called on the GUI thread. Returns
+        ``False`` if a job with the same key was already in flight, in which
+        case the callbacks are attached to that job.
+        """
+        job = self._jobs.get(key)
+        started = job is None
+        if started:
+            job = _Job(fn, args, kwargs)
+            job.signals.finished.connect(lambda result: self._done(key, job, result))
+            job.signals.failed.connect(lambda message: self._error(key, job, message))
+            job.signals.ended.connect(lambda: self._alive.discard(job))
+            self._jobs[key] = job
+            self._alive.add(job)
+        if on_result is not None:
+            job.signals.finished.connect(on_result)
+        if on_error is not None:
+            job.signals.failed.connect(on_error)
+        if started:
+            self._pool.start(job)
+        return started
+
+    def submit_async(self, key, coro_fn, *args, on_result=None, on_error=None, **kwargs):
+        """Run the coroutine ``coro_fn(*args, **kwargs)`` under ``key``.
+
+        Behaves like :meth:`submit`, but the coroutine is scheduled on the
+        background asyncio loop and cancelling it cancels the task.
+        """
+        job = self._jobs.get(key)
+        started = job is None
+        if started:
+            job = _AsyncJob()
+            job.signals.finished.connect(lambda result: self._done(key, job, result))
+            job.signals.failed.connect(lambda message: self._error(key, job, message))
+            self._jobs[key] = job
+        if on_result is not None:
+            job.signals.finished.connect(on_result)
+        if on_error is not None:
+            job.signals.failed.connect(on_error)
+        if started:
+            job.start(poe_async.loop_thread().submit(coro_fn(*args, **kwargs)))
+        return started
+
+    def _done(self, key, job, result):
+        if self._jobs.get(key) is job:
+            del self._jobs[key]
+        self.finished.emit(key, result)
+
+    def _error(self, key, job, message):
+        if self._jobs.get(key) is job:
+            del self._jobs[key]
+        self.failed.emit(key, message)
+
+    def is_running(self, key):
+        return key in self._jobs
+
+    def cancel(self, key):
+        """Drop the job for ``key`` so its result is never delivered."""
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+        job.cancelled = True
+        if isinstance(job, _AsyncJob):
+            job.future.cancel()
+        elif self._pool.tryTake(job):
+            self._alive.discard(job)
+        return True
+
+    def shutdown(self, timeout_ms=2000):
+        """Cancel pending jobs and wait briefly for running ones."""
+        for key in list(self._jobs):
+            self.cancel(key)
+        self._pool.waitForDone(timeout_ms)
+
+
+_runner = None
+
+
+def job_runner():
+    """Return the job runner shared by every view."""
+    global _runner
+    if _runner is None:
+        _runner = JobRunner()
+    return _runner
+
+
+def shutdown_job_runner():
+    """Shut the shared runner down; does nothing if no job was submitted."""
+    if _runner is not None:
+        _runner.shutdown()
@@ -0,0 +1,63 @@
+# ui/list_model.py
+"""List model over the plain dict rows the views keep in memory.
+
+Views edit their rows in place and tell the model which row changed, so
+only that row is repainted instead of the whole list being rebuilt.
+"""
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt6.QtGui import QColor
+
+DEFAULT_COLOR = QColor(Qt.GlobalColor.white)
+
+
+class DictListModel(QAbstractListModel):
+    """Shows ``rows`` (a list of dicts) with ``text(row)`` per line.
+
+    ``color(row)``, if given, returns the row's foreground color. The list
+    is shared with the owning view; mutate it only through :meth:`append`,
+    :meth:`remove` and :meth:`row_changed` so attached views stay in sync.
+    """
+
+    RowRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, rows, text, color=None, parent=None):
+        super().__init__(parent)
+        self.rows = rows
+        self._text = text
+        self._color = color
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.rows):
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._text(row)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self._color(row) if self._color else DEFAULT_COLOR
+        if role == self.RowRole:
+            return row
+        return None
+
+    def append(self, row):
+        position = len(self.rows)
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.append(row)
+        self.endInsertRows()
+
+    def remove(self, position):
+        """Remove and return the row at ``position``."""
+        self.beginRemoveRows(QModelIndex(), position, position)
+        row = self.rows.pop(position)
+        self.endRemoveRows()
+        return row
+
+    def row_changed(self, position):
+        """Repaint the row at ``position`` after it was edited in place."""
+        index = self.index(position)
+        self.dataChanged.emit(
+            index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ForegroundRole]
+        )
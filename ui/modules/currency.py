@@ -0,0 +1,295 @@
+import array
+import bisect
+import os
+import re
+import struct
+import sys
+import threading
+import time
+
+from ui.modules.state_store import DATA_DIR, KeyValueRepository
+
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+
+# (bucket seconds, samples kept) per tier; a bucket of 0 keeps every sample.
+# At most ~370 KB per currency once every tier is full.
+TIERS = (
+    (0, 4096),  # raw samples
+    (60, 7 * 24 * 60),  # last value per minute for a week
+    (3600, 366 * 24),  # last value per hour for a year
+)
+COMPACT_AFTER = 1024  # log records before the tiers are written out again
+INCOME_WINDOW = 3600  # seconds used for the per hour rate in the view
+
+_MAGIC = b"EOH1"
+_RECORD = struct.Struct("<dq")  # timestamp, count
+_SIZE = struct.Struct("<I")
+
+
+class CurrencyRepository(KeyValueRepository):
+    table = "currency"
+
+
+class _Ring:
+    """Bounded series of (timestamp, count) kept in two parallel arrays.
+
+    The arrays grow up to ``capacity``; after that the oldest sample is
+    overwritten. Indexing returns timestamps in order, so :mod:`bisect` can
+    search the ring directly.
+    """
+
+    def __init__(self, capacity, times=None, counts=None):
+        self.capacity = capacity
+        self.times = times if times is not None else array.array("d")
+        self.counts = counts if counts is not None else array.array("q")
+        self.start = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, i):
+        return self.times[(self.start + i) % self.capacity]
+
+    def count(self, i):
+        return self.counts[(self.start + i) % self.capacity]
+
+    def last(self):
+        if not self.times:
+            return None
+        return self[len(self) - 1], self.count(len(self) - 1)
+
+    def append(self, timestamp, count):
+        if len(self.times) < self.capacity:
+            self.times.append(timestamp)
+            self.counts.append(count)
+        else:
+            self.times[self.start] = timestamp
+            self.counts[self.start] = count
+            self.start = (self.start + 1) % self.capacity
+
+    def replace_last(self, timestamp, count):
+        pos = (self.start + len(self) - 1) % self.capacity
+        self.times[pos] = timestamp
+        self.counts[pos] = count
+
+    def slice(self, lo, hi):
+        """Return copies of the timestamps and counts in ``[lo, hi)``."""
+        if hi <= lo:
+            return array.array("d"), array.array("q")
+        a = (self.start + lo) % self.capacity
+        b = a + (hi - lo)
+        if b <= len(self.times):
+            return self.times[a:b], self.counts[a:b]
+        b -= self.capacity
+        return self.times[a:] + self.times[:b], self.counts[a:] + self.counts[:b]
+
+
+class CurrencyHistory:
+    """Count history of one currency, downsampled into :data:`TIERS`.
+
+    Only changes are stored: a sample equal to the previous count is
+    dropped, and the count at any time is the last sample before it.
+    """
+
+    def __init__(self, rings=None):
+        self.tiers = rings or [_Ring(capacity) for _, capacity in TIERS]
+
+    def record(self, timestamp, count):
+        """Add a sample; returns ``False`` if it did not change anything."""
+        last = self.tiers[0].last()
+        if last is not None and (timestamp < last[0] or count == last[1]):
+            return False
+        for (bucket, _), ring in zip(TIERS, self.tiers):
+            # Coarser tiers keep the last sample of each bucket, with its
+            # own timestamp, so every tier answers value_at() exactly at
+            # its resolution.
+            last = ring.last()
+            if last is not None and (
+                last[0] == timestamp or bucket and last[0] // bucket == timestamp // bucket
+            ):
+                ring.replace_last(timestamp, count)
+            else:
+                ring.append(timestamp, count)
+        return True
+
+    def _tier_for(self, timestamp):
+        # The finest tier that still reaches back to ``timestamp``, otherwise
+        # the one reaching back furthest.
+        filled = [ring for ring in self.tiers if len(ring)]
+        for ring in filled:
+            if ring[0] <= timestamp:
+                return ring
+        return min(filled, key=lambda ring: ring[0], default=self.tiers[0])
+
+    def series(self, start, end):
+        """Return ``(timestamps, counts)`` arrays of the samples in ``[start, end]``."""
+        ring = self._tier_for(start)
+        return ring.slice(bisect.bisect_left(ring, start), bisect.bisect_right(ring, end))
+
+    def value_at(self, timestamp):
+        """Return the count at ``timestamp`` or ``None`` before the first sample."""
+        ring = self._tier_for(timestamp)
+        i = bisect.bisect_right(ring, timestamp) - 1
+        return ring.count(i) if i >= 0 else None
+
+    def rate(self, start, end):
+        """Return the average change per hour between ``start`` and ``end``.
+
+        If the history begins after ``start`` the rate is measured from the
+        first sample. Returns ``None`` without enough data.
+        """
+        begin = self.value_at(start)
+        if begin is None:
+            times, counts = self.series(start, end)
+            if not times:
+                return None
+            start, begin = times[0], counts[0]
+        finish = self.value_at(end)
+        if finish is None or end <= start:
+            return None
+        return (finish - begin) * 3600 / (end - start)
+
+
+def _native(values):
+    # Files are little endian; arrays use the machine's byte order.
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+class HistoryStore:
+    """On-disk currency histories in ``directory``.
+
+    Each currency has a ``.log`` file that every new sample is appended to
+    as a fixed width record and a ``.tiers`` snapshot of its rings. Every
+    :data:`COMPACT_AFTER` records the snapshot is rewritten and the log
+    emptied, so loading reads one snapshot plus a short log.
+    """
+
+    def __init__(self, directory=HISTORY_DIR, clock=time.time):
+        self.directory = directory
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._histories = {}
+        self._log_records = {}
+
+    def _path(self, name, suffix):
+        slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+        return os.path.join(self.directory, slug + suffix)
+
+    def _load(self, name):
+        history = CurrencyHistory(self._read_tiers(self._path(name, ".tiers")))
+        records = 0
+        log_path = self._path(name, ".log")
+        try:
+            with open(log_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        partial = len(data) % _RECORD.size
+        if partial:
+            # Drop a record cut short by a crash so later appends line up.
+            data = data[:-partial]
+            os.truncate(log_path, len(data))
+        for timestamp, count in _RECORD.iter_unpack(data):
+            history.record(timestamp, count)
+            records += 1
+        self._log_records[name] = records
+        return history
+
+    @staticmethod
+    def _read_tiers(path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if not data.startswith(_MAGIC):
+            return None
+        rings = []
+        offset = len(_MAGIC)
+        for _, capacity in TIERS:
+            if len(data) < offset + _SIZE.size:
+                return None
+            (size,) = _SIZE.unpack_from(data, offset)
+            offset += _SIZE.size
+            times = array.array("d")
+            times.frombytes(data[offset : offset + 8 * size])
+            offset += 8 * size
+            counts = array.array("q")
+            counts.frombytes(data[offset : offset + 8 * size])
+            offset += 8 * size
+            if len(times) != size or len(counts) != size:
+                return None
+            if size > capacity:
+                times, counts = times[-capacity:], counts[-capacity:]
+            rings.append(_Ring(capacity, _native(times), _native(counts)))
+        return rings
+
+    def _write_tiers(self, name, history):
+        path = self._path(name, ".tiers")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            for ring in history.tiers:
+                times, counts = ring.slice(0, len(ring))
+                f.write(_SIZE.pack(len(times)))
+                f.write(_native(times).tobytes())
+                f.write(_native(counts).tobytes())
+        os.replace(tmp, path)
+        # The snapshot now holds everything in the log.
+        open(self._path(name, ".log"), "wb").close()
+        self._log_records[name] = 0
+
+    def history(self, name):
+        with self._lock:
+            history = self._histories.get(name)
+            if history is None:
+                history = self._histories[name] = self._load(name)
+            return history
+
+    def loaded(self, name):
+        """Return ``True`` once the history of ``name`` is in memory."""
+        with self._lock:
+            return name in self._histories
+
+    def load(self, names):
+        """Read the histories of ``names`` from disk ahead of their first use."""
+        for name in names:
+            self.history(name)
+
+    def record(self, counts, timestamp=None):
+        """Append a sample for every currency in ``counts`` whose count changed."""
+        timestamp = self._clock() if timestamp is None else timestamp
+        os.makedirs(self.directory, exist_ok=True)
+        for name, count in counts.items():
+            history = self.history(name)
+            with self._lock:
+                if not history.record(timestamp, int(count)):
+                    continue
+                with open(self._path(name, ".log"), "ab") as f:
+                    f.write(_RECORD.pack(timestamp, int(count)))
+                self._log_records[name] += 1
+                if self._log_records[name] >= COMPACT_AFTER:
+                    self._write_tiers(name, history)
+
+    def rate(self, name, window=INCOME_WINDOW):
+        """Return the change per hour of ``name`` over the last ``window`` seconds."""
+        now = self._clock()
+        history = self.history(name)
+        with self._lock:
+            return history.rate(now - window, now)
+
+
+def diff_rows(shown, wanted):
+    """Compare the rows on screen with the rows that should be.
+
+    Both map a currency to the tuple of texts in its row. Returns the
+    ``(added, removed, changed)`` currency names, each in ``wanted`` order
+    (``removed`` in ``shown`` order).
+    """
+    added = [name for name in wanted if name not in shown]
+    removed = [name for name in shown if name not in wanted]
+    changed = [name for name in wanted if name in shown and shown[name] != wanted[name]]
+    return added, removed, changed
@@ -0,0 +1,10 @@
+from ui.modules.state_store import ListRepository
+
+
+class FriendsRepository(ListRepository):
+    table = "friends"
+    fields = ("name", "status", "last_seen")
+
+
+def friend_text(friend):
+    return f"{friend['name']} ({friend['status']})"
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from api.http_client import HTTPClient
+
+ICON_DIR = os.path.expanduser("~/.exiledoverlay_cache/icons")
+MAX_DISK_BYTES = 64 * 1024 * 1024
+MAX_MEMORY_BYTES = 32 * 1024 * 1024  # decoded pixmaps, about 4 bytes per pixel
+
+
+class LRUCache:
+    """Least recently used cache bounded by the total cost of its values."""
+
+    def __init__(self, max_cost):
+        self.max_cost = max_cost
+        self.cost = 0
+        self._entries = OrderedDict()  # key -> (value, cost)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, cost):
+        """Store ``value``; a value costing more than ``max_cost`` is not kept."""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.cost -= old[1]
+        if cost > self.max_cost:
+            return
+        self._entries[key] = (value, cost)
+        self.cost += cost
+        while self.cost > self.max_cost:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.cost -= evicted
+
+
+class IconDiskCache:
+    """Icon files stored under the SHA-256 of their URL.
+
+    Files are written atomically, so a reader never sees a partial icon.
+    Once the directory grows past ``max_bytes`` the least recently read
+    icons are deleted.
+    """
+
+    def __init__(self, directory=ICON_DIR, max_bytes=MAX_DISK_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # bytes on disk, counted on the first write
+
+    def path_for(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:])
+
+    def get(self, url):
+        path = self.path_for(url)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # Mark the icon as recently used for trim().
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, url, data):
+        path = self.path_for(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        with self._lock:
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._trim()
+
+    def discard(self, url):
+        path = self.path_for(url)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return
+            if self._size is not None:
+                self._size -= size
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".tmp"):
+                    yield os.path.join(root, name)
+
+    def _scan_size(self):
+        total = 0
+        for path in self._files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _trim(self):
+        # Delete the least recently used icons down to 3/4 of the limit, so
+        # the directory is not walked again on every write.
+        entries = []
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _http_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+
+def fetch_icon(url, disk, client=None):
+    """Return the bytes of the icon at ``url``, from ``disk`` if it has them."""
+    data = disk.get(url)
+    if data is not None:
+        return data
+    resp = (client or _http_client()).get(url)
+    if resp.status != 200:
+        raise RuntimeError(f"Icon request failed with HTTP {resp.status}")
+    try:
+        disk.put(url, resp.body)
+    except OSError as e:
+        print(f"Error caching icon: {e}")
+    return resp.body
@@ -0,0 +1,42 @@
+import importlib
+
+from ui.modules import startup_profiler
+
+
+class ModuleRegistry:
+    """Ordered view factories that are only called when a view is needed.
+
+    A factory is either a callable or a ``"package.module:Attribute"``
+    string, which also defers importing the view's module until then.
+    """
+
+    def __init__(self, factories):
+        self._factories = dict(factories)
+        self._instances = {}
+
+    def names(self):
+        return list(self._factories)
+
+    def __contains__(self, name):
+        return name in self._factories
+
+    def is_built(self, name):
+        return name in self._instances
+
+    def built(self):
+        """Return the views constructed so far, in registration order."""
+        return {n: self._instances[n] for n in self._factories if n in self._instances}
+
+    def get(self, name):
+        """Return the view for ``name``, constructing it on first use."""
+        view = self._instances.get(name)
+        if view is None:
+            factory = self._factories[name]
+            with startup_profiler.span("view", name):
+                if isinstance(factory, str):
+                    module_name, _, attr = factory.partition(":")
+                    with startup_profiler.span("import", module_name):
+                        module = importlib.import_module(module_name)
+                    factory = getattr(module, attr)
+                view = self._instances[name] = factory()
+        return view
@@ -0,0 +1,115 @@
+import time
+
+# Defaults for a view that polls the PoE API.
+BASE_INTERVAL = 30.0  # seconds
+MIN_INTERVAL = 15.0
+MAX_INTERVAL = 600.0
+ERROR_BACKOFF = 2.0  # multiplier after a failed refresh
+IDLE_BACKOFF = 1.5  # multiplier after a refresh that changed nothing
+SPEEDUP = 0.5  # multiplier after a refresh that found changes
+
+
+class AdaptiveInterval:
+    """Polling interval that adapts to what the last refresh found.
+
+    Failures back off exponentially, refreshes that changed nothing back off
+    more gently and a detected change brings the interval back down quickly.
+    """
+
+    def __init__(self, base=BASE_INTERVAL, minimum=MIN_INTERVAL, maximum=MAX_INTERVAL):
+        self.base = base
+        self.minimum = minimum
+        self.maximum = maximum
+        self.interval = base
+        self.failures = 0
+
+    def record(self, changed=False, error=False):
+        if error:
+            self.failures += 1
+            factor = ERROR_BACKOFF
+        else:
+            self.failures = 0
+            factor = SPEEDUP if changed else IDLE_BACKOFF
+        self.interval = min(self.maximum, max(self.minimum, self.interval * factor))
+        return self.interval
+
+    def reset(self):
+        self.interval = self.base
+        self.failures = 0
+
+
+class RefreshTask:
+    def __init__(self, name, callback, policy, endpoint=None):
+        self.name = name
+        self.callback = callback
+        self.policy = policy
+        self.endpoint = endpoint
+        self.next_due = 0.0
+        self.running = False
+
+
+class RefreshPlan:
+    """Bookkeeping behind the overlay's refresh scheduler.
+
+    Keeps one :class:`RefreshTask` per registered view and decides which are
+    due. A task is not started again until its previous run was reported.
+    ``delay_hint`` is asked how long a request to the task's endpoint would
+    currently have to wait for the rate limit; such tasks are postponed
+    instead of queueing behind the limit.
+    """
+
+    def __init__(self, delay_hint=None, clock=time.monotonic):
+        self.tasks = {}
+        self.paused = False
+        self._delay_hint = delay_hint
+        self._clock = clock
+
+    def register(self, name, callback, policy=None, endpoint=None, start_now=True):
+        task = RefreshTask(name, callback, policy or AdaptiveInterval(), endpoint)
+        now = self._clock()
+        task.next_due = now if start_now else now + task.policy.interval
+        self.tasks[name] = task
+        return task
+
+    def unregister(self, name):
+        self.tasks.pop(name, None)
+
+    def due(self):
+        """Return the tasks to start now, marking them as running."""
+        if self.paused:
+            return []
+        now = self._clock()
+        ready = []
+        for task in self.tasks.values():
+            if task.running or task.next_due > now:
+                continue
+            wait = self._delay_hint(task.endpoint) if self._delay_hint and task.endpoint else 0
+            if wait > 0:
+                task.next_due = now + wait
+                continue
+            task.running = True
+            ready.append(task)
+        return ready
+
+    def report(self, name, changed=False, error=False):
+        """Record the outcome of a run and schedule the next one."""
+        task = self.tasks.get(name)
+        if task is None:
+            return
+        task.running = False
+        task.next_due = self._clock() + task.policy.record(changed, error)
+
+    def trigger(self, name):
+        """Make ``name`` due immediately, e.g. after a manual refresh."""
+        task = self.tasks.get(name)
+        if task is not None:
+            task.next_due = self._clock()
+
+    def seconds_until_next(self):
+        """Return how long until the next task is due, or ``None``."""
+        if self.paused:
+            return None
+        pending = [t.next_due for t in self.tasks.values() if not t.running]
+        if not pending:
+            return None
+        return max(0.0, min(pending) - self._clock())
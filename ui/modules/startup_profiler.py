@@ -0,0 +1,189 @@
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = "EXILEDOVERLAY_PROFILE"  # "1" or the path of the report
+FLAG = "--profile-startup"  # --profile-startup or --profile-startup=PATH
+EXIT_FLAG = "--exit-after-startup"
+DEFAULT_REPORT = "startup-profile.txt"
+TOP_SPANS = 25  # spans listed per category in the text report
+
+
+class Span:
+    def __init__(self, category, name, start, parent):
+        self.category = category
+        self.name = name
+        self.start = start
+        self.end = None
+        self.parent = parent
+        self.children = 0.0  # time spent in nested spans
+
+    @property
+    def duration(self):
+        return (self.end or self.start) - self.start
+
+    @property
+    def self_time(self):
+        return self.duration - self.children
+
+
+class StartupProfiler:
+    """Records timed spans of the overlay's startup.
+
+    ``import`` spans come from a hook on :func:`builtins.__import__` that
+    times every module loaded for the first time; ``view`` and ``startup``
+    spans are recorded by the code building the window. Nested spans are
+    subtracted from their parent's self time.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.origin = clock()
+        self.spans = []
+        self.marks = {}
+        self._stack = []
+        self._original_import = None
+        # Spans nest on one stack, so only the thread that started the
+        # profiler (the GUI thread) is recorded.
+        self._thread = threading.get_ident()
+
+    @contextmanager
+    def span(self, category, name):
+        if threading.get_ident() != self._thread:
+            yield None
+            return
+        parent = self._stack[-1] if self._stack else None
+        span = Span(category, name, self._clock(), parent)
+        self.spans.append(span)
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            span.end = self._clock()
+            self._stack.pop()
+            if parent is not None:
+                parent.children += span.duration
+
+    def mark(self, name):
+        """Record the time since the profiler started, e.g. ``first_paint``."""
+        self.marks[name] = self._clock() - self.origin
+
+    def install_import_hook(self):
+        if self._original_import is not None:
+            return
+        original = self._original_import = builtins.__import__
+        profiler = self
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules or threading.get_ident() != profiler._thread:
+                return original(name, globals, locals, fromlist, level)
+            with profiler.span("import", name):
+                return original(name, globals, locals, fromlist, level)
+
+        builtins.__import__ = timed_import
+
+    def uninstall_import_hook(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def summary(self):
+        """Return the recorded data as a JSON serializable dict."""
+        categories = {}
+        for span in self.spans:
+            categories.setdefault(span.category, []).append(
+                {
+                    "name": span.name,
+                    "start": span.start - self.origin,
+                    "duration": span.duration,
+                    "self": span.self_time,
+                }
+            )
+        for spans in categories.values():
+            spans.sort(key=lambda s: s["self"], reverse=True)
+        return {"marks": dict(self.marks), "spans": categories}
+
+    def report(self):
+        summary = self.summary()
+        lines = ["Startup profile", ""]
+        for name, at in sorted(summary["marks"].items(), key=lambda m: m[1]):
+            lines.append(f"{name:<30} {at * 1000:9.1f} ms")
+        for category, spans in sorted(summary["spans"].items()):
+            total = sum(s["self"] for s in spans)
+            lines += ["", f"{category} ({len(spans)} spans, {total * 1000:.1f} ms self time)"]
+            lines.append(f"{'self ms':>9} {'total ms':>9}  name")
+            for s in spans[:TOP_SPANS]:
+                lines.append(f"{s['self'] * 1000:9.1f} {s['duration'] * 1000:9.1f}  {s['name']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the report to ``path``; a ``.json`` path gets the raw summary."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.summary(), f, indent=2)
+            else:
+                f.write(self.report())
+
+
+_profiler = None
+_report_path = None
+exit_after_startup = False
+
+
+def enable(report_path=DEFAULT_REPORT):
+    """Start profiling, including imports, and return the profiler."""
+    global _profiler, _report_path
+    if _profiler is None:
+        _profiler = StartupProfiler()
+        _profiler.install_import_hook()
+    _report_path = report_path
+    return _profiler
+
+
+def enable_from(argv, environ=os.environ):
+    """Enable profiling if ``argv`` or ``environ`` ask for it.
+
+    Removes the profiler's flags from ``argv``. Returns the profiler or
+    ``None``.
+    """
+    global exit_after_startup
+    path = None
+    value = environ.get(ENV_VAR)
+    if value:
+        path = DEFAULT_REPORT if value == "1" else value
+    for arg in list(argv[1:]):
+        if arg == FLAG or arg.startswith(FLAG + "="):
+            path = arg.partition("=")[2] or DEFAULT_REPORT
+            argv.remove(arg)
+        elif arg == EXIT_FLAG:
+            exit_after_startup = True
+            argv.remove(arg)
+    return enable(path) if path else None
+
+
+def active():
+    return _profiler
+
+
+def span(category, name):
+    """Time a block when profiling is enabled; free otherwise."""
+    if _profiler is None:
+        return nullcontext()
+    return _profiler.span(category, name)
+
+
+def finish(mark="first_paint"):
+    """Record ``mark``, stop timing imports and write the report.
+
+    Returns the report path, or ``None`` when profiling is disabled.
+    """
+    if _profiler is None:
+        return None
+    _profiler.mark(mark)
+    _profiler.uninstall_import_hook()
+    _profiler.write(_report_path)
+    return _report_path
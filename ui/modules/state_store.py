@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import threading
+
+DATA_DIR = os.path.expanduser("~/.exiledoverlay")
+DB_FILE = os.path.join(DATA_DIR, "state.db")
+
+# Files the views used to rewrite in the working directory, imported once.
+LEGACY_FILES = {
+    "trackers": "trackers.json",
+    "currency": "currency.json",
+    "target_items": "target_items.json",
+    "friends": "friends.json",
+}
+
+# Each entry upgrades the schema by one version (PRAGMA user_version).
+MIGRATIONS = [
+    """
+    CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE trackers (
+        id INTEGER PRIMARY KEY,
+        position INTEGER NOT NULL,
+        item TEXT NOT NULL,
+        current INTEGER NOT NULL DEFAULT 0,
+        target INTEGER NOT NULL DEFAULT 1
+    );
+    CREATE TABLE currency (name TEXT PRIMARY KEY, count INTEGER NOT NULL);
+    CREATE TABLE target_items (
+        id INTEGER PRIMARY KEY,
+        position INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        location TEXT NOT NULL
+    );
+    CREATE TABLE friends (
+        id INTEGER PRIMARY KEY,
+        position INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        status TEXT,
+        last_seen TEXT
+    );
+    """,
+]
+
+BUSY_TIMEOUT = 5.0  # seconds to wait for another connection's write lock
+
+
+class StateStore:
+    """SQLite database holding the overlay's persistent view state.
+
+    The database runs in WAL mode so every change is a small append that
+    survives a crash, instead of a rewrite of a whole JSON file. All access
+    goes through one connection guarded by a lock.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def _migrate(self):
+        with self.transaction() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+                for statement in script.split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {number}")
+
+    def transaction(self):
+        """Return a context manager running its block in one transaction."""
+        return _Transaction(self)
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_meta(self, key, default=None):
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else default
+
+    def set_meta(self, key, value):
+        self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def import_legacy_json(self, directory="."):
+        """Import the JSON files older versions wrote into ``directory``.
+
+        Each file is imported once, in a single transaction. Files that
+        cannot be parsed are reported and left for a later attempt; the
+        files themselves are never modified.
+        """
+        imported = []
+        for table, filename in LEGACY_FILES.items():
+            path = os.path.join(directory, filename)
+            if self.get_meta(f"imported:{table}") or not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                with self.transaction() as conn:
+                    _IMPORTERS[table](conn, data)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        (f"imported:{table}", path),
+                    )
+            except (OSError, ValueError, TypeError, KeyError, sqlite3.Error) as e:
+                print(f"Error importing {path}: {e}")
+                continue
+            imported.append(table)
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Transaction:
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        try:
+            self.store._conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            # __exit__ does not run when __enter__ raises.
+            self.store._lock.release()
+            raise
+        return self.store._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.store._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.store._lock.release()
+        return False
+
+
+def _import_list(table, fields):
+    def importer(conn, rows):
+        start = conn.execute(f"SELECT COALESCE(MAX(position), 0) FROM {table}").fetchone()[0]
+        for offset, row in enumerate(rows, start=1):
+            values = [row.get(field) for field in fields]
+            conn.execute(
+                f"INSERT INTO {table} (position, {', '.join(fields)}) "
+                f"VALUES (?, {', '.join('?' * len(fields))})",
+                [start + offset, *values],
+            )
+    return importer
+
+
+def _import_currency(conn, counts):
+    conn.executemany(
+        "INSERT OR REPLACE INTO currency (name, count) VALUES (?, ?)",
+        [(name, int(count)) for name, count in counts.items()],
+    )
+
+
+_IMPORTERS = {
+    "trackers": _import_list("trackers", ("item", "current", "target")),
+    "currency": _import_currency,
+    "target_items": _import_list("target_items", ("name", "location")),
+    "friends": _import_list("friends", ("name", "status", "last_seen")),
+}
+
+
+class ListRepository:
+    """Ordered rows of one table, exposed as dicts with an ``id`` key.
+
+    Subclasses set ``table`` and ``fields``. Every method touches a single
+    row, so saving one edit costs the same however long the list is.
+    """
+
+    table = None
+    fields = ()
+
+    def __init__(self, store):
+        self.store = store
+
+    def all(self):
+        rows = self.store.query(
+            f"SELECT id, {', '.join(self.fields)} FROM {self.table} ORDER BY position, id"
+        )
+        return [dict(row) for row in rows]
+
+    def save(self, row):
+        """Insert ``row`` or update it in place; sets ``row["id"]`` on insert."""
+        values = [row.get(field) for field in self.fields]
+        if row.get("id") is not None:
+            assignments = ", ".join(f"{field} = ?" for field in self.fields)
+            self.store.execute(
+                f"UPDATE {self.table} SET {assignments} WHERE id = ?", [*values, row["id"]]
+            )
+        else:
+            cursor = self.store.execute(
+                f"INSERT INTO {self.table} (position, {', '.join(self.fields)}) "
+                f"VALUES ((SELECT COALESCE(MAX(position), 0) + 1 FROM {self.table}), "
+                f"{', '.join('?' * len(self.fields))})",
+                values,
+            )
+            row["id"] = cursor.lastrowid
+        return row
+
+    def remove(self, row_id):
+        self.store.execute(f"DELETE FROM {self.table} WHERE id = ?", (row_id,))
+
+    def delete(self, row):
+        """Remove ``row`` if it was ever saved."""
+        if row.get("id") is not None:
+            self.remove(row["id"])
+
+
+class KeyValueRepository:
+    """``name -> count`` pairs of one table."""
+
+    table = None
+
+    def __init__(self, store):
+        self.store = store
+
+    def all(self):
+        rows = self.store.query(f"SELECT name, count FROM {self.table}")
+        return {row["name"]: row["count"] for row in rows}
+
+    def set_many(self, counts):
+        with self.store.transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (name, count) VALUES (?, ?)",
+                list(counts.items()),
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def state_store():
+    """Return the store shared by every view, importing legacy JSON once."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StateStore()
+            _store.import_legacy_json()
+        return _store
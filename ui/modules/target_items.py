@@ -0,0 +1,10 @@
+from ui.modules.state_store import ListRepository
+
+
+class TargetItemsRepository(ListRepository):
+    table = "target_items"
+    fields = ("name", "location")
+
+
+def item_text(item):
+    return f"{item['name']} - {item['location']}"
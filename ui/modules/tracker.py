@@ -0,0 +1,21 @@
+from ui.modules.state_store import ListRepository
+
+
+class TrackerRepository(ListRepository):
+    table = "trackers"
+    fields = ("item", "current", "target")
+
+
+def progress(tracker):
+    """Return how far ``tracker`` is towards its target, in percent."""
+    if tracker["target"] <= 0:
+        return 100.0
+    return tracker["current"] / tracker["target"] * 100
+
+
+def is_complete(tracker):
+    return tracker["current"] >= tracker["target"]
+
+
+def tracker_text(tracker):
+    return f"{tracker['item']}: {tracker['current']}/{tracker['target']} ({progress(tracker):.1f}%)"
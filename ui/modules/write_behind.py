@@ -0,0 +1,148 @@
+import threading
+import time
+
+DELAY = 0.5  # seconds without new changes before pending writes are flushed
+MAX_DELAY = 5.0  # flush at the latest this long after the oldest pending write
+
+
+class WriteBehind:
+    """Coalesce rapid writes and run them on a background thread.
+
+    Writes are scheduled under a key; scheduling a key that is still pending
+    replaces the earlier write, which then never runs. Pending writes are
+    flushed once no change arrived for ``delay`` seconds, or ``max_delay``
+    after the oldest one, in the order their keys were first scheduled.
+    """
+
+    def __init__(self, delay=DELAY, max_delay=MAX_DELAY, clock=time.monotonic):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._first = None
+        self._last = None
+        self._closed = False
+        # Held while a batch is taken and written, so batches never overlap
+        # or run out of order. Always acquired before _cond.
+        self._write_lock = threading.Lock()
+        self.scheduled = 0
+        self.writes = 0
+        self.saved = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def schedule(self, key, fn, *args):
+        """Run ``fn(*args)`` soon, replacing a pending write for ``key``.
+
+        Once the queue is closed writes run immediately instead.
+        """
+        with self._cond:
+            closed = self._closed
+        if closed:
+            with self._write_lock:
+                self._write([(fn, args)])
+            return
+        with self._cond:
+            now = self._clock()
+            self.scheduled += 1
+            if key in self._pending:
+                self.saved += 1
+            # Replacing a key keeps its original position, so writes stay
+            # in order.
+            self._pending[key] = (fn, args)
+            if self._first is None:
+                self._first = now
+            self._last = now
+            self._cond.notify()
+
+    def discard(self, key):
+        """Drop a pending write for ``key`` without running it."""
+        with self._cond:
+            if self._pending.pop(key, None) is not None:
+                self.saved += 1
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _due_in(self):
+        if not self._pending:
+            return None
+        now = self._clock()
+        return max(0.0, min(self._last + self.delay, self._first + self.max_delay) - now)
+
+    def _take(self):
+        batch = list(self._pending.values())
+        self._pending.clear()
+        self._first = self._last = None
+        return batch
+
+    def _write(self, batch):
+        for fn, args in batch:
+            try:
+                fn(*args)
+            except Exception as e:
+                self.failures += 1
+                print(f"Error writing state: {e}")
+            else:
+                self.writes += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    wait = self._due_in()
+                    if wait == 0:
+                        break
+                    self._cond.wait(wait)
+            self.flush()
+
+    def flush(self):
+        """Run every pending write now, on the calling thread."""
+        with self._write_lock:
+            with self._cond:
+                batch = self._take()
+            self._write(batch)
+
+    def close(self):
+        """Stop the worker after flushing everything still pending."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "scheduled": self.scheduled,
+                "writes": self.writes,
+                "saved": self.saved,
+                "failures": self.failures,
+                "pending": len(self._pending),
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def write_behind():
+    """Return the write-behind queue shared by every view."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteBehind()
+        return _queue
+
+
+def close_write_behind():
+    """Flush and stop the shared queue; does nothing if it was never used."""
+    with _queue_lock:
+        queue = _queue
+    if queue is not None:
+        queue.close()
@@ -5,13 +5,20 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QPoint, pyqtSignal
 from PyQt6.QtGui import QFont
 
-from ui.level_guide_view import LevelGuideView
-from ui.target_items_view import TargetItemsView
-from ui.friends_view import FriendsView
-from ui.pob_view import PathOfBuildingView
-from ui.currency_view import CurrencyView
-from ui.tracker_view import TrackerView
-from ui.account_view import AccountView
+from ui.modules.module_registry import ModuleRegistry
+from ui.refresh_scheduler import refresh_scheduler
+
+# Views are imported and built the first time they are selected, so the
+# collapsed sidebar appears without loading any of them.
+MODULES = [
+    ("Account", "ui.account_view:AccountView"),
+    ("Levelguide", "ui.level_guide_view:LevelGuideView"),
+    ("Target Items", "ui.target_items_view:TargetItemsView"),
+    ("Friends", "ui.friends_view:FriendsView"),
+    ("Path of Building", "ui.pob_view:PathOfBuildingView"),
+    ("Currency", "ui.currency_view:CurrencyView"),
+    ("Tracker", "ui.tracker_view:TrackerView"),
+]
 
 class OverlayWindow(QMainWindow):
     def __init__(self):
@@ -39,18 +46,12 @@ class OverlayWindow(QMainWindow):
         self.expanded_width = 500
         self.expanded_sidebar_width = 220
         
-        self.modules = {
-            "Account": AccountView(),
-            "Levelguide": LevelGuideView(),
-            "Target Items": TargetItemsView(),
-            "Friends": FriendsView(),
-            "Path of Building": PathOfBuildingView(),
-            "Currency": CurrencyView(),
-            "Tracker": TrackerView(),
-        }
+        self.modules = ModuleRegistry(MODULES)
         
         self._init_ui()
         self._apply_styles()
+        # Nothing is visible while collapsed, so don't poll until expanded.
+        refresh_scheduler().set_paused(True)
 
     def _init_ui(self):
         main_widget = QWidget()
@@ -79,7 +80,7 @@ class OverlayWindow(QMainWindow):
         
         # Module buttons
         self.module_buttons = {}
-        for name in self.modules.keys():
+        for name in self.modules.names():
             btn = QPushButton(self._get_icon_for_module(name))
             btn.setFixedSize(50, 40)
             btn.setToolTip(name)
@@ -90,11 +91,9 @@ class OverlayWindow(QMainWindow):
         sidebar_layout.addStretch()
         self.main_layout.addWidget(self.sidebar)
         
-        # Content area (initially hidden)
+        # Content area (initially hidden); views are added as they are built
         self.content_area = QStackedWidget()
         self.content_area.setVisible(False)
-        for view in self.modules.values():
-            self.content_area.addWidget(view)
         self.main_layout.addWidget(self.content_area)
 
     def _get_icon_for_module(self, module_name):
@@ -142,6 +141,8 @@ class OverlayWindow(QMainWindow):
         self.is_expanded = not self.is_expanded
         
         if self.is_expanded:
+            if self.content_area.count() == 0:
+                self._show_module(self.modules.names()[0])
             self.setFixedWidth(self.expanded_width)
             self.sidebar.setFixedWidth(self.expanded_sidebar_width)
             self.content_area.setVisible(True)
@@ -161,13 +162,27 @@ class OverlayWindow(QMainWindow):
             for name, btn in self.module_buttons.items():
                 btn.setText(self._get_icon_for_module(name))
                 btn.setFixedSize(50, 40)
+        
+        refresh_scheduler().set_paused(not self.is_expanded)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        refresh_scheduler().set_paused(not self.is_expanded)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        refresh_scheduler().set_paused(True)
 
     def switch_module(self, module_name):
+        self._show_module(module_name)
         if not self.is_expanded:
             self.toggle_sidebar()
-        
-        index = list(self.modules.keys()).index(module_name)
-        self.content_area.setCurrentIndex(index)
+
+    def _show_module(self, module_name):
+        view = self.modules.get(module_name)
+        if self.content_area.indexOf(view) == -1:
+            self.content_area.addWidget(view)
+        self.content_area.setCurrentWidget(view)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -0,0 +1,85 @@
+# ui/refresh_scheduler.py
+"""Central scheduler for views that poll the PoE API.
+
+Views register a refresh callback instead of running their own ``QTimer``.
+A single timer fires whichever tasks are due according to each task's
+:class:`~ui.modules.refresh_policy.AdaptiveInterval`. The overlay pauses the
+scheduler while it is collapsed or hidden, and tasks whose endpoint is
+currently rate limited are postponed until the governor has budget again.
+"""
+
+from PyQt6.QtCore import QObject, QTimer
+
+from ui.modules.refresh_policy import AdaptiveInterval, RefreshPlan
+
+
+def _delay_hint(endpoint):
+    # Imported when a task first asks, so the overlay window can pause the
+    # scheduler without loading the API modules before its first paint.
+    from api import poe_api
+
+    return poe_api.rate_limiter.delay_hint(endpoint)
+
+
+class RefreshScheduler(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.plan = RefreshPlan(delay_hint=_delay_hint)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._run_due)
+
+    def register(self, name, callback, policy=None, endpoint=None, start_now=True):
+        """Poll ``callback(name)`` on an adaptive interval.
+
+        The callback must eventually call :meth:`report` with the outcome,
+        usually from the result handler of a background job.
+        """
+        self.plan.register(name, callback, policy or AdaptiveInterval(), endpoint, start_now)
+        self._reschedule()
+
+    def unregister(self, name):
+        self.plan.unregister(name)
+        self._reschedule()
+
+    def report(self, name, changed=False, error=False):
+        self.plan.report(name, changed, error)
+        self._reschedule()
+
+    def trigger(self, name):
+        """Run ``name`` as soon as possible, e.g. for a Refresh button."""
+        self.plan.trigger(name)
+        self._reschedule()
+
+    def set_paused(self, paused):
+        self.plan.paused = paused
+        if paused:
+            self._timer.stop()
+        else:
+            self._reschedule()
+
+    def _run_due(self):
+        for task in self.plan.due():
+            try:
+                task.callback(task.name)
+            except Exception:
+                self.plan.report(task.name, error=True)
+        self._reschedule()
+
+    def _reschedule(self):
+        delay = self.plan.seconds_until_next()
+        if delay is None:
+            self._timer.stop()
+        else:
+            self._timer.start(int(delay * 1000))
+
+
+_scheduler = None
+
+
+def refresh_scheduler():
+    """Return the scheduler shared by every view."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RefreshScheduler()
+    return _scheduler
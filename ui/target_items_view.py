@@ -1,16 +1,19 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-    QPushButton, QListWidget, QListWidgetItem, QMessageBox
+    QPushButton, QListView
 )
-from PyQt6.QtCore import Qt
-import json
-import os
+from ui.list_model import DictListModel
+from ui.modules.state_store import state_store
+from ui.modules.target_items import TargetItemsRepository, item_text
+from ui.modules.write_behind import write_behind
+import sqlite3
 
 class TargetItemsView(QWidget):
     def __init__(self):
         super().__init__()
-        self.items_file = "target_items.json"
+        self.repo = TargetItemsRepository(state_store())
         self.target_items = self.load_items()
+        self.model = DictListModel(self.target_items, item_text)
         self._build_ui()
 
     def _build_ui(self):
@@ -38,8 +41,9 @@ class TargetItemsView(QWidget):
         layout.addLayout(add_layout)
         
         # Items list
-        self.items_list = QListWidget()
-        self.items_list.itemDoubleClicked.connect(self.remove_item)
+        self.items_list = QListView()
+        self.items_list.setModel(self.model)
+        self.items_list.doubleClicked.connect(self.remove_item)
         layout.addWidget(self.items_list)
         
         # Info label
@@ -48,45 +52,34 @@ class TargetItemsView(QWidget):
         layout.addWidget(info)
         
         self.setLayout(layout)
-        self.refresh_list()
 
     def load_items(self):
-        if os.path.exists(self.items_file):
-            try:
-                with open(self.items_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-
-    def save_items(self):
         try:
-            with open(self.items_file, 'w') as f:
-                json.dump(self.target_items, f, indent=2)
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to save items: {e}")
+            return self.repo.all()
+        except sqlite3.Error as e:
+            print(f"Error loading target items: {e}")
+            return []
+
+    def save_items(self, *items):
+        """Queue the given items for saving."""
+        for item in items:
+            write_behind().schedule(("target_items", id(item)), self.repo.save, item)
+
+    def delete_item(self, item):
+        write_behind().schedule(("target_items", id(item)), self.repo.delete, item)
 
     def add_item(self):
         item_name = self.item_input.text().strip()
         location = self.location_input.text().strip()
         
         if item_name and location:
-            self.target_items.append({"name": item_name, "location": location})
-            self.save_items()
-            self.refresh_list()
+            target = {"name": item_name, "location": location}
+            self.model.append(target)
+            self.save_items(target)
             self.item_input.clear()
             self.location_input.clear()
 
-    def remove_item(self, item):
-        row = self.items_list.row(item)
+    def remove_item(self, index):
+        row = index.row()
         if 0 <= row < len(self.target_items):
-            del self.target_items[row]
-            self.save_items()
-            self.refresh_list()
-
-    def refresh_list(self):
-        self.items_list.clear()
-        for item in self.target_items:
-            list_item = QListWidgetItem(f"{item['name']} - {item['location']}")
-            list_item.setForeground(Qt.GlobalColor.white)
-            self.items_list.addItem(list_item)
+            self.delete_item(self.model.remove(row))
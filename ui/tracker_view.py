@@ -1,17 +1,24 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QSpinBox, QListWidget, QListWidgetItem
+    QPushButton, QSpinBox, QListView
 )
 from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
 from api import poe_auth, poe_api
-import json
-import os
+from ui.job_runner import job_runner
+from ui.list_model import DictListModel
+from ui.modules.state_store import state_store
+from ui.modules.tracker import TrackerRepository, is_complete, tracker_text
+from ui.modules.write_behind import write_behind
+import sqlite3
 
 class TrackerView(QWidget):
     def __init__(self):
         super().__init__()
-        self.trackers_file = "trackers.json"
+        poe_auth.start_token_refresher()
+        self.repo = TrackerRepository(state_store())
         self.trackers = self.load_trackers()
+        self.model = DictListModel(self.trackers, tracker_text, self._tracker_color)
         self._build_ui()
 
     def _build_ui(self):
@@ -55,8 +62,9 @@ class TrackerView(QWidget):
         layout.addLayout(add_layout)
         
         # Trackers list
-        self.trackers_list = QListWidget()
-        self.trackers_list.itemDoubleClicked.connect(self.edit_tracker)
+        self.trackers_list = QListView()
+        self.trackers_list.setModel(self.model)
+        self.trackers_list.doubleClicked.connect(self.edit_tracker)
         layout.addWidget(self.trackers_list)
         
         # Control buttons
@@ -80,88 +88,132 @@ class TrackerView(QWidget):
         
         layout.addLayout(btn_layout)
         
+        refresh_btn = QPushButton("Refresh All from Stash")
+        refresh_btn.clicked.connect(self.refresh_all_trackers)
+        layout.addWidget(refresh_btn)
+        
+        # Why the last stash update failed, e.g. not logged in
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #ff7777;")
+        self.status_label.setWordWrap(True)
+        self.status_label.hide()
+        layout.addWidget(self.status_label)
+        
         self.setLayout(layout)
-        self.refresh_list()
 
     def load_trackers(self):
-        if os.path.exists(self.trackers_file):
-            try:
-                with open(self.trackers_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-
-    def save_trackers(self):
         try:
-            with open(self.trackers_file, 'w') as f:
-                json.dump(self.trackers, f, indent=2)
-        except:
-            pass
+            return self.repo.all()
+        except sqlite3.Error as e:
+            print(f"Error loading trackers: {e}")
+            return []
+
+    def save_trackers(self, *trackers):
+        """Queue the given trackers for saving.
+
+        Repeated edits of a tracker within the write-behind window become a
+        single write.
+        """
+        for tracker in trackers:
+            write_behind().schedule(("trackers", id(tracker)), self.repo.save, tracker)
+
+    def delete_tracker(self, tracker):
+        # Replaces a pending save of the same tracker.
+        write_behind().schedule(("trackers", id(tracker)), self.repo.delete, tracker)
 
     def add_tracker(self):
         item_name = self.item_input.text().strip()
         if item_name:
-            count = self.count_input.value()
-            try:
-                token = poe_auth.ensure_valid_token("account:stashes")
-                count = poe_api.fetch_item_count(
-                    token.get("access_token"),
-                    "Standard",
-                    item_name,
-                )
-            except Exception:
-                # Fall back to user provided value on error
-                pass
+            # Show the user provided count right away and replace it with the
+            # stash count once that arrives.
             tracker = {
                 "item": item_name,
-                "current": count,
+                "current": self.count_input.value(),
                 "target": self.target_input.value(),
             }
-            self.trackers.append(tracker)
-            self.save_trackers()
-            self.refresh_list()
+            self.model.append(tracker)
+            self.save_trackers(tracker)
             self.item_input.clear()
             self.count_input.setValue(0)
             self.target_input.setValue(100)
+            job_runner().submit(
+                f"tracker:{item_name}",
+                self._fetch_counts,
+                [item_name],
+                on_result=self._apply_counts,
+                on_error=self._show_status,
+            )
+
+    def refresh_all_trackers(self):
+        """Update every tracker's count from the stash in a single sweep."""
+        if not self.trackers:
+            return
+        job_runner().submit(
+            "tracker:refresh-all",
+            self._fetch_counts,
+            {tracker["item"] for tracker in self.trackers},
+            on_result=self._apply_counts,
+            on_error=self._show_status,
+        )
+
+    @staticmethod
+    def _fetch_counts(item_names):
+        token = poe_auth.ensure_valid_token("account:stashes")
+        return poe_api.fetch_item_counts(
+            token.get("access_token"),
+            "Standard",
+            item_names,
+        )
+
+    def _show_status(self, message):
+        self.status_label.setText(message)
+        self.status_label.setVisible(bool(message))
+
+    def _apply_counts(self, counts):
+        # Errors keep the stored counts; trackers removed meanwhile are
+        # simply not in the list any more.
+        self._show_status("")
+        changed = []
+        for row, tracker in enumerate(self.trackers):
+            if tracker["item"] in counts and tracker["current"] != counts[tracker["item"]]:
+                tracker["current"] = counts[tracker["item"]]
+                changed.append(tracker)
+                self.model.row_changed(row)
+        if changed:
+            self.save_trackers(*changed)
+
+    @staticmethod
+    def _tracker_color(tracker):
+        if is_complete(tracker):
+            return QColor(Qt.GlobalColor.green)
+        return QColor(Qt.GlobalColor.white)
 
-    def refresh_list(self):
-        self.trackers_list.clear()
-        for tracker in self.trackers:
-            progress = (tracker["current"] / tracker["target"]) * 100
-            text = f"{tracker['item']}: {tracker['current']}/{tracker['target']} ({progress:.1f}%)"
-            
-            list_item = QListWidgetItem(text)
-            if tracker["current"] >= tracker["target"]:
-                list_item.setForeground(Qt.GlobalColor.green)
-            else:
-                list_item.setForeground(Qt.GlobalColor.white)
-            
-            self.trackers_list.addItem(list_item)
+    def _selected_row(self):
+        index = self.trackers_list.currentIndex()
+        return index.row() if index.isValid() else -1
 
     def modify_selected(self, change):
-        current_row = self.trackers_list.currentRow()
+        current_row = self._selected_row()
         if 0 <= current_row < len(self.trackers):
             self.trackers[current_row]["current"] = max(0, self.trackers[current_row]["current"] + change)
-            self.save_trackers()
-            self.refresh_list()
-            self.trackers_list.setCurrentRow(current_row)
+            self.save_trackers(self.trackers[current_row])
+            self.model.row_changed(current_row)
 
     def reset_selected(self):
-        current_row = self.trackers_list.currentRow()
+        current_row = self._selected_row()
         if 0 <= current_row < len(self.trackers):
             self.trackers[current_row]["current"] = 0
-            self.save_trackers()
-            self.refresh_list()
-            self.trackers_list.setCurrentRow(current_row)
+            self.save_trackers(self.trackers[current_row])
+            self.model.row_changed(current_row)
 
     def remove_selected(self):
-        current_row = self.trackers_list.currentRow()
+        current_row = self._selected_row()
         if 0 <= current_row < len(self.trackers):
-            del self.trackers[current_row]
-            self.save_trackers()
-            self.refresh_list()
+            removed = self.model.remove(current_row)
+            if all(t["item"] != removed["item"] for t in self.trackers):
+                job_runner().cancel(f"tracker:{removed['item']}")
+            self.delete_tracker(removed)
 
-    def edit_tracker(self, item):
+    def edit_tracker(self, index):
         """Double-click to increment the selected tracker by 1."""
         self.modify_selected(1)